@@ -1,5 +1,5 @@
 import re
-from opp_env.opp_env import NaturalSortedStr
+from opp_env.opp_env import Version
 description = "INET Framework is an open-source OMNeT++ model suite for wired, wireless and mobile networks."
 
 def dotx(version):
@@ -10,8 +10,8 @@ def join_nonempty_items(sep, list):
     return sep.join([x for x in list if x])
 
 def make_inet_project_description(inet_version, omnetpp_versions):
-    inet_version = NaturalSortedStr(inet_version)
-    is_git_branch = inet_version == "git" or inet_version.endswith(".x")
+    inet_version = Version(inet_version)
+    is_git_branch = inet_version.is_git_branch
     is_modernized = inet_version == "git" or inet_version.endswith(".x") # TODO and the patch-release tags on .x branches
 
     git_branch_or_tag_name = f"v{inet_version}" if inet_version[0].isdigit() else "master" if inet_version == "git" else inet_version
@@ -1,6 +1,6 @@
 import re
 import platform
-from opp_env.opp_env import NaturalSortedStr
+from opp_env.opp_env import Version, ProjectDescription
 
 def join_nonempty_items(sep, list):
     return sep.join([x for x in list if x])
@@ -13,16 +13,16 @@ def trim_lines(text):
     return '\n'.join(trimmed_lines)
 
 def make_omnetpp_project_description(version, base_version=None, is_modernized=False):
-    version = NaturalSortedStr(version)
-    base_version = NaturalSortedStr(base_version or version)
-    canonical_version = version.replace("p", ".") if re.match(r"\d+\.\d+p\d+", version) else version+".0" if version.count('.') == 1 else version
+    version = Version(version)
+    base_version = Version(base_version or version)
+    canonical_version = version.canonical
 
     # Some patch releases are installed by downloading the preceding release ("base version"),
     # and patching them from the repo.
     github_url = "https://github.com/omnetpp/omnetpp"
 
     # Github automatically makes source archives available under a different URL for tags and branches.
-    is_git_branch = version.endswith(".x") or version=="git"
+    is_git_branch = version.is_git_branch
 
     git_branch_or_tag_name = f"omnetpp-{version}" if version[0].isdigit() else "master" if version == "git" else version
 
@@ -266,6 +266,8 @@ def make_omnetpp_project_description(version, base_version=None, is_modernized=F
         "name": "omnetpp",
         "version": canonical_version,
         "description": "OMNeT++ base system",
+        # the programs built into bin/ (opp_run, opp_msgc, etc.) and the simulations of the samples have no extension
+        "potential_build_outputs": [*ProjectDescription.DEFAULT_POTENTIAL_BUILD_OUTPUTS, "bin/*:noext", "samples/*:noext"],
         "warnings": ["This version (versions <6.0) is not supported on Apple Silicon."] if is_unsupported_apple_silicon else remove_blanks([
             join_nonempty_items(" ", [
                 f"This is not a modernized version of OMNeT++. Consider using a later patchlevel for a cleaner compilation and bug fixes." if not is_modernized and version >= "5.0" else None,
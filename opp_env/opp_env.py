@@ -1,19 +1,17 @@
 import argparse
-import copy
+import functools
 import itertools
 import json
 import logging
 import os
-import subprocess
 import sys
 import re
-import shutil
-import tempfile
 import importlib
-import importlib.metadata
-import platform
 from collections import OrderedDict
 
+# Note: Modules that are only needed by some of the subcommands (subprocess, shutil, tempfile, platform, hashlib,
+# pickle, copy, importlib.metadata) are imported locally in the functions that use them, to keep startup fast.
+
 # make sure that this run-time version check is in synch with the metadata for python requirement in the project.toml file.
 if sys.version_info < (3,9):
     v = sys.version_info
@@ -64,8 +62,12 @@ class ColoredLoggingFormatter(logging.Formatter):
         formatter = logging.Formatter(format)
         return formatter.format(record)
 
+_digits_regex = re.compile('([0-9]+)')
+
+@functools.lru_cache(maxsize=None)
 def natural_sort_key(text):
-    return [int(part) if part.isdigit() else part.lower() for part in re.split('([0-9]+)', text)]
+    # cached, as the same versions and project names are compared and sorted over and over again
+    return tuple(int(part) if part.isdigit() else part.lower() for part in _digits_regex.split(text))
 
 def natural_less(a, b):
     return natural_sort_key(a) < natural_sort_key(b)
@@ -82,6 +84,209 @@ def sorted_projects(project_description_list):
 def uniq(l):
     return list(dict.fromkeys(l))
 
+def compute_file_digest(filename):
+    # SHA-1 digest of the file's content (raw bytes), the same as the 'shasum' tool computes by default
+    import hashlib
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+def compute_file_digests(filenames, max_workers=None):
+    # digests of many files, computed in a thread pool: hashlib releases the GIL while it hashes large buffers,
+    # so this is bound by I/O rather than by the interpreter
+    filenames = list(filenames)
+    if len(filenames) < 2:
+        return [compute_file_digest(filename) for filename in filenames]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) + 4)) as executor:
+        return list(executor.map(compute_file_digest, filenames))
+
+# Snapshot files (*.snap) hold the digests and stat data of the files of a project, sorted by path. Layout: a header
+# (magic, recording time in ns, number of entries), then for each file: the length of the prefix it shares with the
+# previous path, the length of the rest of the path, the SHA-1 digest (raw), size, mtime_ns and inode, then the rest
+# of the path (UTF-8, with surrogate escapes for undecodable file names). Entries are (path, digest, size, mtime_ns,
+# inode) tuples, and paths are project-relative, in './dir/file' form.
+SNAPSHOT_MAGIC = b"OPPSNAP1"
+SNAPSHOT_HEADER_FORMAT = "<8sQQ"
+SNAPSHOT_ENTRY_FORMAT = "<HH20sQqQ"
+
+def write_snapshot_file(filename, recording_time_ns, entries):
+    # entries must be sorted by path; the file is replaced atomically
+    import struct
+    entry_struct = struct.Struct(SNAPSHOT_ENTRY_FORMAT)
+    temp_file = filename + ".tmp"
+    with open(temp_file, "wb") as f:
+        f.write(struct.pack(SNAPSHOT_HEADER_FORMAT, SNAPSHOT_MAGIC, recording_time_ns, len(entries)))
+        previous_path = b""
+        for filepath, digest, size, mtime_ns, inode in entries:
+            encoded_path = filepath.encode("utf-8", "surrogateescape")
+            prefix_length = 0
+            max_prefix_length = min(len(previous_path), len(encoded_path), 0xffff)
+            while prefix_length < max_prefix_length and previous_path[prefix_length] == encoded_path[prefix_length]:
+                prefix_length += 1
+            f.write(entry_struct.pack(prefix_length, len(encoded_path) - prefix_length, digest, size, mtime_ns, inode))
+            f.write(encoded_path[prefix_length:])
+            previous_path = encoded_path
+    os.replace(temp_file, filename)
+
+def read_snapshot_file(filename):
+    # returns (recording_time_ns, iterator over the entries); the file is memory-mapped and decoded lazily
+    import mmap
+    import struct
+    with open(filename, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, recording_time_ns, num_entries = struct.unpack_from(SNAPSHOT_HEADER_FORMAT, data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        data.close()
+        raise Exception(f"{filename} is not an opp_env snapshot file")
+    def iterate():
+        entry_struct = struct.Struct(SNAPSHOT_ENTRY_FORMAT)
+        offset = struct.calcsize(SNAPSHOT_HEADER_FORMAT)
+        path = b""
+        try:
+            for _ in range(num_entries):
+                prefix_length, suffix_length, digest, size, mtime_ns, inode = entry_struct.unpack_from(data, offset)
+                offset += entry_struct.size
+                path = path[:prefix_length] + data[offset:offset + suffix_length]
+                offset += suffix_length
+                yield path.decode("utf-8", "surrogateescape"), digest, size, mtime_ns, inode
+        finally:
+            data.close()
+    return recording_time_ns, iterate()
+
+def export_snapshot_as_text(entries, file):
+    # writes the entries in the format of the 'shasum' tool, so that they can be verified with 'shasum --check'
+    file.writelines(f"{digest.hex()}  {filepath}\n" for filepath, digest, size, mtime_ns, inode in entries)
+
+def compare_snapshots(entries1, entries2):
+    # Streaming merge-join of two sorted snapshots: yields ("new" | "disappeared" | "changed", path) items,
+    # where "new" means only present in the second one.
+    it1, it2 = iter(entries1), iter(entries2)
+    entry1, entry2 = next(it1, None), next(it2, None)
+    while entry1 is not None or entry2 is not None:
+        if entry2 is None or (entry1 is not None and entry1[0] < entry2[0]):
+            yield "disappeared", entry1[0]
+            entry1 = next(it1, None)
+        elif entry1 is None or entry2[0] < entry1[0]:
+            yield "new", entry2[0]
+            entry2 = next(it2, None)
+        else:
+            if entry1[1] != entry2[1]:
+                yield "changed", entry1[0]
+            entry1, entry2 = next(it1, None), next(it2, None)
+
+class ChangeTrackingFilter:
+    # Decides which files of a project are covered by its snapshots (and thus by the modification checks), based on the
+    # project's potential_build_inputs / potential_build_outputs glob patterns, matched against the project-relative
+    # path ('*' also matches '/'). An output pattern with the ':noext' suffix (e.g. 'bin/*:noext') only matches files
+    # without an extension, i.e. executables; as extensionless files are often sources too (e.g. configure, setenv,
+    # Makefile, scripts), such a pattern does not apply to the files that match an input pattern. Policies:
+    #  - "all": every file
+    #  - "skip-outputs": every file except build outputs
+    #  - "inputs-only": only the files matching the input patterns
+    POLICIES = ["all", "skip-outputs", "inputs-only"]
+
+    def __init__(self, policy, input_patterns, output_patterns):
+        self.policy = policy
+        self.inputs_regex = self._compile(input_patterns)
+        self.outputs_regex = self._compile(p for p in output_patterns if not p.endswith(":noext"))
+        self.noext_outputs_regex = self._compile(p.removesuffix(":noext") or "*" for p in output_patterns if p.endswith(":noext"))
+        # directories all of whose contents are outputs (e.g. "out/*") are not walked at all
+        self.pruned_dirs_regex = self._compile(p[:-2] for p in output_patterns if p.endswith("/*") and "*" not in p[:-2])
+
+    @classmethod
+    def for_project(cls, project_description):
+        return cls(project_description.change_tracking, project_description.potential_build_inputs, project_description.potential_build_outputs)
+
+    @staticmethod
+    def _compile(patterns):
+        import fnmatch
+        patterns = list(patterns)
+        return re.compile("|".join(fnmatch.translate(p) for p in patterns)) if patterns else None
+
+    def is_tracked(self, filepath):
+        # filepath is in './dir/file' form
+        if self.policy == "all":
+            return True
+        relpath = filepath.removeprefix("./")
+        is_input = self.inputs_regex is not None and self.inputs_regex.match(relpath) is not None
+        if self.policy == "inputs-only":
+            return is_input
+        if self.outputs_regex is not None and self.outputs_regex.match(relpath):
+            return False
+        if is_input or self.noext_outputs_regex is None:
+            return True
+        return "." in relpath.rsplit("/", 1)[-1] or self.noext_outputs_regex.match(relpath) is None
+
+    def is_pruned(self, dirpath):
+        # whether the directory (in './dir' form) can be skipped entirely
+        return self.policy != "all" and self.pruned_dirs_regex is not None and self.pruned_dirs_regex.match(dirpath.removeprefix("./")) is not None
+
+    def filter_entries(self, entries):
+        return (entry for entry in entries if self.is_tracked(entry[0]))
+
+class Inotify:
+    # Minimal binding of the Linux inotify API via ctypes, for 'opp_env watch'. Events are (wd, mask, cookie, name) tuples.
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_DONT_FOLLOW = 0x02000000
+    IN_EXCL_UNLINK = 0x04000000
+    IN_ISDIR = 0x40000000
+
+    def __init__(self):
+        import ctypes
+        import platform
+        if platform.system() != "Linux":
+            raise Exception("Watching the workspace for changes requires Linux (inotify)")
+        self.ctypes = ctypes
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise_error("inotify_init1")
+
+    def _raise_error(self, what):
+        errno = self.ctypes.get_errno()
+        raise OSError(errno, f"{what}: {os.strerror(errno)}")
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            self._raise_error(f"Cannot watch '{path}'")
+        return wd
+
+    def read_events(self, timeout=None):
+        # returns an empty list if no event arrived within timeout seconds
+        import select
+        import struct
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        data = os.read(self.fd, 256 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, name_length = struct.unpack_from("iIII", data, offset)
+            offset += struct.calcsize("iIII")
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
 def indent(txt, indent="    "):
     return indent + txt.replace("\n", "\n" + indent)
 
@@ -90,20 +295,21 @@ def join_lines(lines):
     return "\n".join([li for li in lines if li])
 
 def join_commands(commands):
-    assert type(commands) is list
+    assert type(commands) in (list, tuple)
     # note: we resort to decorating each line with  "|| exit $?"
     # because "set -e" cannot be made to work reliably -- we tried!
     # see https://mywiki.wooledge.org/BashFAQ/105 for background
     return "\n".join([f"{{ {cmd}; }} || exit $?" for cmd in commands if cmd])
 
-def topological_sort(nodes, is_edge):
+def topological_sort(nodes, get_neighbors):
+    # get_neighbors(node) returns the nodes that have an edge from node, in the order they occur in nodes
     visited = set()
     stack = []
 
     def dfs_rec(node):
         visited.add(node)
-        for neighbor in nodes:
-            if neighbor not in visited and is_edge(node, neighbor):
+        for neighbor in get_neighbors(node):
+            if neighbor not in visited:
                 dfs_rec(neighbor)
         stack.append(node)
 
@@ -114,22 +320,89 @@ def topological_sort(nodes, is_edge):
     stack.reverse()
     return stack
 
+class DependencyGraph:
+    """The dependency relationships among a set of project descriptions (typically the effective projects of a
+    command), computed once: direct dependencies as adjacency lists, and transitive dependencies on demand, cached.
+    Create one where a project set is queried several times, and pass it around instead of the list."""
+
+    def __init__(self, project_descriptions):
+        self.project_descriptions = list(project_descriptions)
+        self.positions_by_name = {}
+        for i, p in enumerate(self.project_descriptions):
+            self.positions_by_name.setdefault(p.name, []).append(i)
+        # direct dependencies: i -> positions of the projects that project i requires, in the order of project_descriptions
+        self.adjacency = [self._get_required_positions(p) for p in self.project_descriptions]
+        self.positions = {}
+        for i, p in enumerate(self.project_descriptions):
+            self.positions.setdefault(p, i)
+        self.dependencies = {}  # i -> transitive dependencies of project i; filled in lazily
+
+    def get_dependencies(self, project_description):
+        # transitive dependencies of the project among the projects of the graph, in depth-first discovery order;
+        # the project itself need not be part of the graph
+        i = self.positions.get(project_description)
+        if i is None:
+            return self._compute_dependencies(self._get_required_positions(project_description))
+        if i not in self.dependencies:
+            self.dependencies[i] = self._compute_dependencies(self.adjacency[i], i)
+        return list(self.dependencies[i])
+
+    def get_sorted_project_descriptions(self):
+        # dependents before their dependencies
+        order = topological_sort(range(len(self.project_descriptions)), lambda i: self.adjacency[i])
+        return [self.project_descriptions[i] for i in order]
+
+    def _get_required_positions(self, project_description):
+        return sorted(j for name in project_description.required_projects for j in self.positions_by_name.get(name, []))
+
+    def _compute_dependencies(self, direct_dependencies, start=None):
+        deps = list(direct_dependencies)
+        processed = set() if start is None else {start}
+        todo = list(deps)
+        while todo:
+            k = todo.pop()
+            if k not in processed:
+                new_deps = [j for j in self.adjacency[k] if j not in processed]
+                deps += new_deps
+                processed.add(k)
+                todo.extend(new_deps)
+        return [self.project_descriptions[j] for j in deps]
+
 def sort_by_project_dependencies(project_descriptions):
-    def depends_on(project_a, project_b):
-        return project_b.name in project_a.required_projects
-    sorted = topological_sort(project_descriptions, depends_on)
-    return sorted
-
-class NaturalSortedStr(str):
-    """String with numeric component comparison, useful for comparing versions (avoids lexicographic pitfalls like '4.10' < '4.9').
-    Subclasses str, so all string operations (startswith, f-strings, ==, etc.) work unchanged."""
-    def __lt__(self, other): return natural_sort_key(self) <  natural_sort_key(other)
-    def __le__(self, other): return natural_sort_key(self) <= natural_sort_key(other)
-    def __gt__(self, other): return natural_sort_key(self) >  natural_sort_key(other)
-    def __ge__(self, other): return natural_sort_key(self) >= natural_sort_key(other)
+    return DependencyGraph(project_descriptions).get_sorted_project_descriptions()
+
+class Version(str):
+    """A project version, e.g. "6.1.0", "4.2p1" (patch level), "4.2.x" (maintenance branch) or "git" (main branch).
+    Subclasses str, so all string operations (startswith, f-strings, ==, hashing, etc.) work unchanged, but comparisons
+    use natural ordering: numeric components are compared as numbers (avoids lexicographic pitfalls like '4.10' < '4.9'),
+    "4.2p1" sorts after "4.2.1", "4.2.x" after all "4.2.*" releases, and "git" after all numbered versions.
+    The sort key is computed only once per distinct version string (see natural_sort_key())."""
+    __slots__ = ()
+
+    @property
+    def key(self):
+        return natural_sort_key(self)
+
+    def __lt__(self, other): return self.key <  _version_key(other)
+    def __le__(self, other): return self.key <= _version_key(other)
+    def __gt__(self, other): return self.key >  _version_key(other)
+    def __ge__(self, other): return self.key >= _version_key(other)
     def __eq__(self, other): return str.__eq__(self, other)
     __hash__ = str.__hash__
 
+    @property
+    def is_git_branch(self):
+        # whether it names a branch (as opposed to a release tag)
+        return self == "git" or self.endswith(".x")
+
+    @property
+    def canonical(self):
+        # three-component form of release versions: "4.2p1" -> "4.2.1", "6.0" -> "6.0.0"
+        return Version(self.replace("p", ".") if re.match(r"\d+\.\d+p\d+", self) else self + ".0" if self.count('.') == 1 else self)
+
+def _version_key(version):
+    return version.key if isinstance(version, Version) else natural_sort_key(version)
+
 def is_semver(version):
     # supported formats: "3.2", "3.2.1", "3.2p1" or "3.2.1.231125"
     # note: this only VERY loosely based on https://semver.org/ (see BNF grammar there)
@@ -145,16 +418,30 @@ def parse_semver(version):
     major, minor, micro, nano = match.groups()
     return int(major), int(minor), int(micro) if micro is not None else 0, int(nano) if nano is not None else 0
 
-def version_matches(wildcard_version, version):
+def check_version_pattern(wildcard_version):
     if not re.match(r"^[^*?]+(\.\*)?$", wildcard_version):
         raise Exception(f"Unsupported version pattern '{wildcard_version}', only '.*' is allowed at the end")
+
+def version_matches(wildcard_version, version):
+    check_version_pattern(wildcard_version)
     if wildcard_version.endswith(".*"):
         truncated = wildcard_version[0:-2]
         return version == truncated or version.startswith(truncated+".") or version.startswith(truncated+"p") # "3.3.*" should match "3.3p1" too
     else:
         return wildcard_version == version
 
-def create_arg_parser():
+class _VersionAction(argparse.Action):
+    # like action='version', but only determines the version when the option is actually used
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        print(get_version())
+        parser.exit()
+
+def create_arg_parser(selected_subcommands=None):
+    # selected_subcommands: names of the subcommands whose arguments and descriptions need to be
+    # set up (None means all); the rest are only registered so that they appear in the help
     def dedent(text):
         # remove the common indentation from all lines
         lines = text.split("\n")
@@ -201,47 +488,16 @@ def create_arg_parser():
     parser.add_argument("-d", "--debug", default=False, action='store_true', help="Equivalent to '--print-stacktrace --log-level DEBUG'")
     parser.add_argument("-l", "--log-level", choices=["ERROR", "WARN", "INFO", "DEBUG"], default="INFO", help="Log level of output")
     parser.add_argument("-p", "--print-stacktrace", default=False, action='store_true', help="Print stack trace on error")
-    parser.add_argument("-v", "--version", action='version', version=get_version(), help="Print version information and exit")
+    parser.add_argument("-v", "--version", action=_VersionAction, help="Print version information and exit")
 
     subparsers = parser.add_subparsers(help='', dest='subcommand', metavar='COMMAND')
 
-    subparser = subparsers.add_parser("list", help="Lists all available projects", description=
-        """
-        Lists all available projects. If you want to add a new project to the database,
-        send a pull request against our GitHub repository at https://github.com/omnetpp/opp_env,
-        or simpler, open an issue and ask us to do it.
-        """)
-    subparser.add_argument("project_name_patterns", nargs="*", metavar="project-name-or-pattern", help=
-                           "Project names, project names with versions, or in general, regular expressions that match "
-                           "the beginning of the project names with versions to be selected. Omit to list all projects.")
-    group = subparser.add_mutually_exclusive_group()
-    group.add_argument("--flat", dest="list_mode", action="store_const", const="flat", help="List projects with available versions, one per line")
-    group.add_argument("--grouped", dest="list_mode", action="store_const", const="grouped", help="List the available versions for each project")
-    group.add_argument("--names", dest="list_mode", action="store_const", const="names", help="List project names only (without version numbers)")
-    group.add_argument("--descriptions", dest="list_mode", action="store_const", const="descriptions", help="List project names with descriptions only, one per line")
-    group.add_argument("--aliases", dest="list_mode", action="store_const", const="aliases", help="List version aliases for projects")
-    group.add_argument("--matching", dest="list_mode", action="store_const", const="matching", help="List the version combinations in which the specified projects can be used together")
-    group.add_argument("--expand", dest="list_mode", action="store_const", const="expand", help="List the default version combinations in which the specified projects can be used together, including dependencies. If no project is specified, it expands the dependency list of all projects")
-    group.add_argument("--expand-all", dest="list_mode", action="store_const", const="expand-all", help="List all version combinations in which the specified projects can be used together, including dependencies. If no project is specified, it expands the dependency list of all projects.")
-
-    subparser = subparsers.add_parser("info", help="Describes the specified project", description=
-        """
-        Prints the description(s) of the specified project(s). The default mode prints
-        a human-readable summary; use '--raw' to get the full project description with all details.
-        """)
-    subparser.add_argument("projects", nargs="*", help=
-        """
-        The list of projects to describe. You can specify exact versions like 'inet-4.0' or project names like 'inet'.
-        The latter will print info on all versions of the project. An empty list prints info on all projects.
-        """)
-    subparser.add_argument("--raw", action='store_true', default=False, help=
-        """
-        Print the full project descriptions in a raw form.
-        The output includes details such as the download URL, the required projects with their acceptable versions,
-        the required NIX packages, the patch / setenv / build / clean commands, the available installation options, and more.
-        The output is well-formed JSON, so you can use tools like 'jq' to further query it and extract the desired data.
-        """)
-    subparser.add_argument("--options", action='append', metavar='[PROJECT:]NAME,...', help="Print the project description as if the given project options were selected")
+    def add_subcommand(name, help, add_details):
+        # the description and the arguments are only added to the parser of the selected subcommand(s),
+        # the others are only needed for listing the available subcommands in the help
+        subparser = subparsers.add_parser(name, help=help)
+        if selected_subcommands is None or name in selected_subcommands:
+            add_details(subparser)
 
     def add_argument(subparser, name):
         if name=="projects":     subparser.add_argument("projects", nargs="+", help=
@@ -281,6 +537,18 @@ def create_arg_parser():
             Ignore dependencies among projects, only operate on the projects explicitly listed on the command line.
             This allows projects to be used together in previously untested or "unofficial" combinations.
             """)
+        elif name=="explain-resolution": subparser.add_argument("--explain-resolution", default=False, action='store_true', help=
+            """
+            Report how the effective set of projects was chosen by the dependency resolution: the number of candidate versions
+            of each involved project, the number of versions examined and rejected by each constraint, and the time it took.
+            """)
+        elif name=="prefer-installed": subparser.add_argument("--prefer-installed", default=False, action='store_true', help=
+            """
+            When resolving dependencies, prefer the versions of projects that are already downloaded in the workspace
+            over the newest compatible versions, in order to avoid unnecessary downloads and builds. The choice is greedy:
+            dependencies are resolved one after the other, each taking an installed version if one is compatible with the
+            choices made so far, so the result is not guaranteed to reuse the largest possible number of installed projects.
+            """)
         elif name=="options":    subparser.add_argument("--options", action='append', metavar='[PROJECT:]NAME,...', help=
             """
             Select project options to use; use 'opp_env info' to see what options a selected project has.
@@ -364,183 +632,267 @@ def create_arg_parser():
         for name in names:
             add_argument(subparser, name)
 
-    subparser = subparsers.add_parser("init", help="Designates the current working directory to be an opp_env workspace", description=dedent(
-        """
-        Designates the current working directory, or the directory specified via -w or --workspace,
-        to be an opp_env workspace. The directory is expected to be empty.
-        If the directory does not exist, it is created (only a single directory level).
-        If the directory is already an opp_env workspace, an error is raised.
-        """),
-        formatter_class=argparse.RawDescriptionHelpFormatter)
-    add_arguments(subparser, [
-        "workspace",
-        "force-init",
-        "nixless-workspace"
-    ])
+    def add_list_details(subparser):
+        subparser.description = """
+            Lists all available projects. If you want to add a new project to the database,
+            send a pull request against our GitHub repository at https://github.com/omnetpp/opp_env,
+            or simpler, open an issue and ask us to do it.
+            """
+        subparser.add_argument("project_name_patterns", nargs="*", metavar="project-name-or-pattern", help=
+                               "Project names, project names with versions, or in general, regular expressions that match "
+                               "the beginning of the project names with versions to be selected. Omit to list all projects.")
+        group = subparser.add_mutually_exclusive_group()
+        group.add_argument("--flat", dest="list_mode", action="store_const", const="flat", help="List projects with available versions, one per line")
+        group.add_argument("--grouped", dest="list_mode", action="store_const", const="grouped", help="List the available versions for each project")
+        group.add_argument("--names", dest="list_mode", action="store_const", const="names", help="List project names only (without version numbers)")
+        group.add_argument("--descriptions", dest="list_mode", action="store_const", const="descriptions", help="List project names with descriptions only, one per line")
+        group.add_argument("--aliases", dest="list_mode", action="store_const", const="aliases", help="List version aliases for projects")
+        group.add_argument("--matching", dest="list_mode", action="store_const", const="matching", help="List the version combinations in which the specified projects can be used together")
+        group.add_argument("--expand", dest="list_mode", action="store_const", const="expand", help="List the default version combinations in which the specified projects can be used together, including dependencies. If no project is specified, it expands the dependency list of all projects")
+        group.add_argument("--expand-all", dest="list_mode", action="store_const", const="expand-all", help="List all version combinations in which the specified projects can be used together, including dependencies. If no project is specified, it expands the dependency list of all projects.")
+        subparser.add_argument("--explain-resolution", default=False, action='store_true', help=
+                               "Report the work done by the dependency resolution for the --matching, --expand and --expand-all modes")
+    add_subcommand("list", "Lists all available projects", add_list_details)
+
+    def add_info_details(subparser):
+        subparser.description = """
+            Prints the description(s) of the specified project(s). The default mode prints
+            a human-readable summary; use '--raw' to get the full project description with all details.
+            """
+        subparser.add_argument("projects", nargs="*", help=
+            """
+            The list of projects to describe. You can specify exact versions like 'inet-4.0' or project names like 'inet'.
+            The latter will print info on all versions of the project. An empty list prints info on all projects.
+            """)
+        subparser.add_argument("--raw", action='store_true', default=False, help=
+            """
+            Print the full project descriptions in a raw form.
+            The output includes details such as the download URL, the required projects with their acceptable versions,
+            the required NIX packages, the patch / setenv / build / clean commands, the available installation options, and more.
+            The output is well-formed JSON, so you can use tools like 'jq' to further query it and extract the desired data.
+            """)
+        subparser.add_argument("--options", action='append', metavar='[PROJECT:]NAME,...', help="Print the project description as if the given project options were selected")
+    add_subcommand("info", "Describes the specified project", add_info_details)
 
-    subparser = subparsers.add_parser("install", help="Downloads and builds the specified projects in their environment", description=dedent(
-        """
-        Downloads the specified project or projects along with their dependencies in the current workspace,
-        patches or configures them as needed, and builds them.
-        (The patching step is used for things like adjusting the setenv, Makefile or makefrag files
-        so that dependencies are found, running the configure script, or applying minor changes
-        to the source code to fix compilation errors due to compiler or library changes.)
-
-        The download step is skipped for projects that are already downloaded.
-        Any step of the process can be turned off using command-line options.
-        Installation by cloning the Git repository and checking out a specific branch
-        (for setting up a development environment for contributing to the project) is also supported.
-
-        To ensure maximum reproducibility, the 'install' command runs the session in isolated mode.
-        This can be changed by specifying the '--non-isolated' option.
-
-        Examples:
-            $ opp_env install inet-latest  # installs the latest version of INET, with a matching OMNeT++ version
-            $ opp_env install inet-latest omnetpp-6.0.1  # like above, but with a specific OMNeT++ version
-            $ opp_env install inet-latest --no-deps --no-patch --no-build  # downloads and unpacks INET only (without patching/building it)
-            $ opp_env install inet-git  # installs INET by checking out the 'master' branch from its Git repository
-            $ opp_env install inet-4.2.10 --options=inet:from-git  # installs INET by checking out the 'v4.2.10' tag from its Git repository
-            $ opp_env install inet-git@topic/mybranch  # installs INET by checking out the 'topic/mybranch' branch from its Git repository, allowing further development
-        """),
-        formatter_class=argparse.RawDescriptionHelpFormatter)
-    add_arguments(subparser, [
-        "projects",
-        "quiet",
-        "init",
-        "nixless-workspace",
-        "workspace",
-        "options",
-        "add-extra-nix-packages",
-        "smoke-test",
-        "test",
-        "no-deps",
-        "no-pause",
-        "no-cleanup",
-        "no-patch",
-        "no-build",
-        "build-modes",
-        "no-isolated",
-        "keep",
-        "local"
-    ])
-
-    subparser = subparsers.add_parser("shell", help="Opens a shell in the environment of the specified projects", description=dedent("""
-        Opens a shell in the environment of the specified projects.
-        If no projects are specified, all projects in the current workspace are used.
-        Many options are available to request additional operations (building, testing, or
-        even workspace initialization and project installation) and for controlling further details.
-
-        The shell opens with the environment variables already set up for working with the projects,
-        e.g. the 'setenv' scripts (of projects that have one) are sourced. Additionally, the location of each project
-        is made available in its '<projectname>_ROOT' environment variable: 'OMNETPP_ROOT', 'INET_ROOT', etc.
-        The 'BUILD_MODES' environment variable contains the build modes passed to the '--build-modes' option.
-
-        Shortcut commands are also available in the shell for building, cleaning, checking, etc.
-        each project: 'build_inet', 'build_omnetpp', 'build_all', 'clean_inet', 'clean_omnetpp', 'clean_all', etc.
-        These commands accept one or more build modes, such as 'debug' or 'release'; if none is specified,
-        the default is the modes in the 'BUILD_MODES' environment variable.
-        The 'check_inet', check_omnetpp', 'check_all', etc. commands verify that the projects' files
-        have not been changed since the download+patching step. (This is made possible by 'shasum' and 'diff'.)
-
-        For the convenience of the user, the shell session is created in non-isolated mode, meaning that
-        programs installed in the host OS are also accessible in addition to the packages provided via Nix.
-        This sometimes causes things to break in unexpected ways; if that happens, use the '--isolated' option.
-
-        Examples:
-            $ opp_env shell  # opens the shell for working with all projects in the workspace
-            $ opp_env shell inet-latest  # opens a shell with the existing INET installation in the workspace
-            $ opp_env shell --install inet-latest  # installs INET if not yet installed, then opens a shell for working with it
-        """),
-        formatter_class=argparse.RawDescriptionHelpFormatter)
-    add_arguments(subparser, [
-        "projects-optional",
-        "init",
-        "nixless-workspace",
-        "workspace",
-        "options",
-        "chdir",
-        "no-deps",
-        "no-pause",
-        "no-cleanup",
-        "no-patch",
-        "add-extra-nix-packages",
-        "install",
-        "no-build", # with --install
-        "build",
-        "build-modes",
-        "quiet",
-        "isolated",
-        "keep",
-        "local"
-    ])
-
-    subparser = subparsers.add_parser("run", help="Runs a command in the environment of the specified projects", description=dedent(
-        """
-        Runs a command in the environment of the specified projects.
-        If no projects are specified, all projects in the current workspace are used.
-        Many options are available to request addition operations (building, testing, or
-        even workspace initialization and project installation) and for controlling further details.
+    def add_init_details(subparser):
+        subparser.description = dedent(
+            """
+            Designates the current working directory, or the directory specified via -w or --workspace,
+            to be an opp_env workspace. The directory is expected to be empty.
+            If the directory does not exist, it is created (only a single directory level).
+            If the directory is already an opp_env workspace, an error is raised.
+            """)
+        subparser.formatter_class = argparse.RawDescriptionHelpFormatter
+        add_arguments(subparser, [
+            "workspace",
+            "force-init",
+            "nixless-workspace"
+        ])
+    add_subcommand("init", "Designates the current working directory to be an opp_env workspace", add_init_details)
 
-        The environment in which the command is executed is the same as for the 'shell' command.
-        Unlike the 'shell' command which tries to change into the first project's directory for the user's convenience,
-        'run' does NOT change the current directory before running the command.
+    def add_install_details(subparser):
+        subparser.description = dedent(
+            """
+            Downloads the specified project or projects along with their dependencies in the current workspace,
+            patches or configures them as needed, and builds them.
+            (The patching step is used for things like adjusting the setenv, Makefile or makefrag files
+            so that dependencies are found, running the configure script, or applying minor changes
+            to the source code to fix compilation errors due to compiler or library changes.)
+
+            The download step is skipped for projects that are already downloaded.
+            Any step of the process can be turned off using command-line options.
+            Installation by cloning the Git repository and checking out a specific branch
+            (for setting up a development environment for contributing to the project) is also supported.
+
+            To ensure maximum reproducibility, the 'install' command runs the session in isolated mode.
+            This can be changed by specifying the '--non-isolated' option.
+
+            Examples:
+                $ opp_env install inet-latest  # installs the latest version of INET, with a matching OMNeT++ version
+                $ opp_env install inet-latest omnetpp-6.0.1  # like above, but with a specific OMNeT++ version
+                $ opp_env install inet-latest --no-deps --no-patch --no-build  # downloads and unpacks INET only (without patching/building it)
+                $ opp_env install inet-git  # installs INET by checking out the 'master' branch from its Git repository
+                $ opp_env install inet-4.2.10 --options=inet:from-git  # installs INET by checking out the 'v4.2.10' tag from its Git repository
+                $ opp_env install inet-git@topic/mybranch  # installs INET by checking out the 'topic/mybranch' branch from its Git repository, allowing further development
+            """)
+        subparser.formatter_class = argparse.RawDescriptionHelpFormatter
+        add_arguments(subparser, [
+            "projects",
+            "quiet",
+            "init",
+            "nixless-workspace",
+            "workspace",
+            "options",
+            "add-extra-nix-packages",
+            "smoke-test",
+            "test",
+            "no-deps",
+            "explain-resolution",
+            "prefer-installed",
+            "no-pause",
+            "no-cleanup",
+            "no-patch",
+            "no-build",
+            "build-modes",
+            "no-isolated",
+            "keep",
+            "local"
+        ])
+    add_subcommand("install", "Downloads and builds the specified projects in their environment", add_install_details)
+
+    def add_shell_details(subparser):
+        subparser.description = dedent("""
+            Opens a shell in the environment of the specified projects.
+            If no projects are specified, all projects in the current workspace are used.
+            Many options are available to request additional operations (building, testing, or
+            even workspace initialization and project installation) and for controlling further details.
+
+            The shell opens with the environment variables already set up for working with the projects,
+            e.g. the 'setenv' scripts (of projects that have one) are sourced. Additionally, the location of each project
+            is made available in its '<projectname>_ROOT' environment variable: 'OMNETPP_ROOT', 'INET_ROOT', etc.
+            The 'BUILD_MODES' environment variable contains the build modes passed to the '--build-modes' option.
+
+            Shortcut commands are also available in the shell for building, cleaning, checking, etc.
+            each project: 'build_inet', 'build_omnetpp', 'build_all', 'clean_inet', 'clean_omnetpp', 'clean_all', etc.
+            These commands accept one or more build modes, such as 'debug' or 'release'; if none is specified,
+            the default is the modes in the 'BUILD_MODES' environment variable.
+            The 'check_inet', check_omnetpp', 'check_all', etc. commands verify that the projects' files
+            have not been changed since the download+patching step.
+
+            For the convenience of the user, the shell session is created in non-isolated mode, meaning that
+            programs installed in the host OS are also accessible in addition to the packages provided via Nix.
+            This sometimes causes things to break in unexpected ways; if that happens, use the '--isolated' option.
+
+            Examples:
+                $ opp_env shell  # opens the shell for working with all projects in the workspace
+                $ opp_env shell inet-latest  # opens a shell with the existing INET installation in the workspace
+                $ opp_env shell --install inet-latest  # installs INET if not yet installed, then opens a shell for working with it
+            """)
+        subparser.formatter_class = argparse.RawDescriptionHelpFormatter
+        add_arguments(subparser, [
+            "projects-optional",
+            "init",
+            "nixless-workspace",
+            "workspace",
+            "options",
+            "chdir",
+            "no-deps",
+            "explain-resolution",
+            "prefer-installed",
+            "no-pause",
+            "no-cleanup",
+            "no-patch",
+            "add-extra-nix-packages",
+            "install",
+            "no-build", # with --install
+            "build",
+            "build-modes",
+            "quiet",
+            "isolated",
+            "keep",
+            "local"
+        ])
+    add_subcommand("shell", "Opens a shell in the environment of the specified projects", add_shell_details)
 
-        To ensure maximum reproducibility, the 'run' command runs the session in isolated mode.
-        This can be changed by specifying the '--non-isolated' option.
+    def add_run_details(subparser):
+        subparser.description = dedent(
+            """
+            Runs a command in the environment of the specified projects.
+            If no projects are specified, all projects in the current workspace are used.
+            Many options are available to request addition operations (building, testing, or
+            even workspace initialization and project installation) and for controlling further details.
 
-        Examples :
+            The environment in which the command is executed is the same as for the 'shell' command.
+            Unlike the 'shell' command which tries to change into the first project's directory for the user's convenience,
+            'run' does NOT change the current directory before running the command.
 
-            # Run the 'aloha' example in OMNeT++ 6.0.3 then exit
-            # (expects the current directory to be a workspace with OMNeT++ already installed):
-            $ opp_env run omnetpp-6.0.3 -c 'cd omnetpp-6.0.3/samples/aloha && ./aloha'
+            To ensure maximum reproducibility, the 'run' command runs the session in isolated mode.
+            This can be changed by specifying the '--non-isolated' option.
 
-            # Install OMNeT++ and INET, then run the MANET Routing showcase simulation:
-            $ opp_env run inet-4.5.0 -w inet-workspace --init --install --chdir \\
-                -c 'cd inet-4.5.0/showcases/routing/manet && inet'
+            Examples :
 
-            # Smoke test an existing INET installation:
-            $ opp_env run inet-4.5.0 --smoke-test
+                # Run the 'aloha' example in OMNeT++ 6.0.3 then exit
+                # (expects the current directory to be a workspace with OMNeT++ already installed):
+                $ opp_env run omnetpp-6.0.3 -c 'cd omnetpp-6.0.3/samples/aloha && ./aloha'
 
-            # Rebuild all projects
-            $ opp_env run -c "clean_all && build_all"
+                # Install OMNeT++ and INET, then run the MANET Routing showcase simulation:
+                $ opp_env run inet-4.5.0 -w inet-workspace --init --install --chdir \\
+                    -c 'cd inet-4.5.0/showcases/routing/manet && inet'
 
-        """),
-        formatter_class=argparse.RawDescriptionHelpFormatter)
-    add_arguments(subparser, [
-        "projects-optional",
-        "init",
-        "nixless-workspace",
-        "workspace",
-        "command",
-        "options",
-        "chdir@run",
-        "no-deps",
-        "no-pause",
-        "no-cleanup",
-        "no-patch",
-        "add-extra-nix-packages",
-        "install",
-        "no-build", # with --install
-        "build",
-        "smoke-test",
-        "test",
-        "build-modes",
-        "quiet",
-        "no-isolated",
-        "keep",
-        "local"
-    ])
-
-    subparser = subparsers.add_parser("maint", help="Maintenance functions", description="Maintenance functions for internal use.")
-    subparser.add_argument("-u", "--update-catalog", metavar="download-items-dir", dest="catalog_dir", help="Update the opp_env installation commands in the model catalog of omnetpp.org. The argument should point to the `download-items/` subdir of a checked-out copy of the https://github.com/omnetpp/omnetpp.org/ repository.")
-
-    subparser = subparsers.add_parser("upgrade", help="Upgrade opp_env to the latest version", description=
-        "Detects how opp_env was installed and runs the appropriate upgrade command.")
+                # Smoke test an existing INET installation:
+                $ opp_env run inet-4.5.0 --smoke-test
+
+                # Rebuild all projects
+                $ opp_env run -c "clean_all && build_all"
+
+            """)
+        subparser.formatter_class = argparse.RawDescriptionHelpFormatter
+        add_arguments(subparser, [
+            "projects-optional",
+            "init",
+            "nixless-workspace",
+            "workspace",
+            "command",
+            "options",
+            "chdir@run",
+            "no-deps",
+            "explain-resolution",
+            "prefer-installed",
+            "no-pause",
+            "no-cleanup",
+            "no-patch",
+            "add-extra-nix-packages",
+            "install",
+            "no-build", # with --install
+            "build",
+            "smoke-test",
+            "test",
+            "build-modes",
+            "quiet",
+            "no-isolated",
+            "keep",
+            "local"
+        ])
+    add_subcommand("run", "Runs a command in the environment of the specified projects", add_run_details)
+
+    def add_maint_details(subparser):
+        subparser.description = "Maintenance functions for internal use."
+        subparser.add_argument("-u", "--update-catalog", metavar="download-items-dir", dest="catalog_dir", help="Update the opp_env installation commands in the model catalog of omnetpp.org. The argument should point to the `download-items/` subdir of a checked-out copy of the https://github.com/omnetpp/omnetpp.org/ repository.")
+        subparser.add_argument("--update-manifest", default=False, action='store_true', help="Regenerate the manifest file of the project database, which maps project names to the database module that defines them. Must be run after adding projects to the database.")
+        subparser.add_argument("--compile-database", default=False, action='store_true', help="Evaluate, validate and expand the whole project database for all supported platforms, and save the result into a file that is loaded at startup instead of the database modules. This is done when building the distribution package.")
+    add_subcommand("maint", "Maintenance functions", add_maint_details)
+
+    def add_watch_details(subparser):
+        subparser.description = dedent("""
+            Watches the files of the projects in the workspace for changes, until interrupted with Ctrl+C (or SIGTERM).
+            Run it in the background (e.g. in a separate terminal) in long-lived workspaces.
+
+            While it is running, it maintains a journal of changed files for each project (in the project's .opp_env
+            subdirectory), and opp_env uses the journals instead of walking the project directory trees when checking
+            whether a project has been modified since download (on 'opp_env shell' and 'opp_env run', and in the
+            check_<project> shell functions). This makes these checks fast even in large workspaces or on slow file systems.
+            When the watcher is not running, opp_env falls back to walking the directory trees.
+
+            Requires Linux (inotify). Only changes made on this host are seen.
+            """)
+        subparser.formatter_class = argparse.RawDescriptionHelpFormatter
+        add_arguments(subparser, [
+            "projects-optional",
+            "workspace",
+        ])
+    add_subcommand("watch", "Maintains a change journal of the projects in the workspace", add_watch_details)
+
+    def add_upgrade_details(subparser):
+        subparser.description = "Detects how opp_env was installed and runs the appropriate upgrade command."
+    add_subcommand("upgrade", "Upgrade opp_env to the latest version", add_upgrade_details)
 
     return parser
 
 def process_arguments():
-    parser = create_arg_parser()
+    # only set up the arguments of the subcommand being invoked, to keep startup fast
+    subcommand_names = ["list", "info", "init", "install", "shell", "run", "watch", "maint", "upgrade"]
+    subcommand = next((arg for arg in sys.argv[1:] if arg in subcommand_names), None)
+    parser = create_arg_parser([subcommand] if subcommand else None)
     args = parser.parse_args(sys.argv[1:])
     if args.help_intro:
         print_intro()
@@ -588,16 +940,24 @@ To install and use the latest version of the INET Framework with a single comman
 To run a simulation model directly with the latest version of OMNeT++, run:
   opp_env run --install omnetpp-latest -c 'cd $OMNETPP_ROOT/samples/aloha;./aloha'""")
 
+def get_cache_directory():
+    # follows the XDG Base Directory Specification, like most command-line tools
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "opp_env")
+
 def get_version():
+    # prefer the version file written by setuptools_scm, because importlib.metadata is expensive to import
+    try:
+        from opp_env._version import version
+        return version
+    except ImportError:
+        pass
+    import importlib.metadata
     try:
         return importlib.metadata.version("opp_env")
     except importlib.metadata.PackageNotFoundError:
         return "unknown"
 
-import os
-import platform
-import subprocess
-
 def get_linux_distribution():
     try:
         with open("/etc/os-release") as f:
@@ -640,6 +1000,7 @@ def suggest_nix_installation():
 
 
 def detect_nix():
+    import subprocess
     minimum_nix_version = "2.8"
     # check nix is installed
     try:
@@ -665,7 +1026,9 @@ def detect_nix():
         raise Exception(f"Your Nix installation of version {nix_version} is too old, at least version {minimum_nix_version} is required. The newest version is available from https://nixos.org/download.html. See also the --nixless-workspace option in the help.")
 
 def detect_tools():
-    tools = [ "bash", "git", "curl", "grep", "find", "xargs", "shasum", "tar", "gzip", "sed", "touch" ]
+    import platform
+    import subprocess
+    tools = [ "bash", "git", "curl", "grep", "find", "xargs", "tar", "gzip", "sed", "touch" ]
 
     is_macos = platform.system().lower() == "darwin"
     if not is_macos:
@@ -681,6 +1044,7 @@ def detect_tools():
         raise Exception(f"The following programs were not found: {', '.join(errors)}.")
 
 def is_inside_git_working_tree(dir):
+    import subprocess
     try:
         result = subprocess.run(['git', '-C', dir, 'rev-parse', '--is-inside-work-tree'], capture_output=True, text=True)
         return result.returncode == 0 and result.stdout.strip() == 'true'
@@ -688,7 +1052,47 @@ def is_inside_git_working_tree(dir):
         _logger.debug(f"Could not check whether {dir} is inside a git working tree -- git not installed? Exception: {ex}")
         return None  # false-ish
 
+_interned_tuples = {}
+
+def intern_tuple(items):
+    # returns a tuple with the given items, sharing the instance (and the strings in it) with equal tuples created earlier
+    items = tuple(sys.intern(item) if type(item) is str else item for item in items)
+    return _interned_tuples.setdefault(items, items)
+
 class ProjectDescription:
+    # Project descriptions are immutable: list-valued fields are stored as interned tuples, which makes the
+    # (often identical) command lists of different versions of a project share storage. Use replace() to create
+    # modified copies. The dict-valued fields (required_projects, options, metadata) must not be modified either.
+    # List-valued fields may also be given as functions that return the list: these are only called when the field
+    # is first accessed, so that commands that only need a few fields (e.g. 'list') don't pay for computing the rest.
+    # Note that to_dict() and pickling evaluate them, so deferring gains nothing for sources that are snapshotted
+    # or compiled (which includes the built-in database); it is meant for descriptions that are only used live.
+    FIELDS = (
+        "name", "version", "description", "details", "warnings",
+        "nixos", "stdenv", "folder_name",
+        "required_projects", "nix_packages", "vars_to_keep",
+        "download_url", "git_url", "git_branch", "download_commands",
+        "patch_commands", "patch_url",
+        "shell_hook_commands", "setenv_commands",
+        "build_commands", "clean_commands", "smoke_test_commands", "test_commands",
+        "potential_build_inputs", "potential_build_outputs", "change_tracking",
+        "options", "metadata"
+    )
+
+    # deferred_fields: field name -> function, for the list fields not yet computed
+    # activated_copies: memoized results of activate_project_options(); not part of the description proper
+    __slots__ = (*FIELDS, "deferred_fields", "activated_copies")
+
+    # defaults of potential_build_inputs and potential_build_outputs; database entries may extend them
+    DEFAULT_POTENTIAL_BUILD_INPUTS = ("src/*", "*.cc", "*.cxx", "*.c", "*.h", "*.hpp", "*.hh", "*.msg", "Makefile", "*/Makefile", "makefrag", "*/makefrag")
+    DEFAULT_POTENTIAL_BUILD_OUTPUTS = ("out/*", "*.o", "*.a", "*.a.*", "*.so", "*.so.*", "*.dylib", "*.dylib.*", "*.dll", "*.exe", "lib/*:noext", "*/lib/*:noext", "*/out/*:noext")
+
+    LIST_FIELDS = (
+        "warnings", "nix_packages", "vars_to_keep", "download_commands", "patch_commands",
+        "shell_hook_commands", "setenv_commands", "build_commands", "clean_commands", "smoke_test_commands", "test_commands",
+        "potential_build_inputs", "potential_build_outputs"
+    )
+
     def __init__(self, name, version, description=None, details=None, warnings=[],
                  nixos=None, stdenv=None, folder_name=None,
                  required_projects={}, nix_packages=[], vars_to_keep=[],
@@ -696,52 +1100,129 @@ class ProjectDescription:
                  patch_commands=[], patch_url=None,
                  shell_hook_commands=[], setenv_commands=[],
                  build_commands=[], clean_commands=[], smoke_test_commands=[], test_commands=[],
-                 potential_build_inputs=None, potential_build_outputs=None,
+                 potential_build_inputs=None, potential_build_outputs=None, change_tracking=None,
                  options=None, metadata=None):
         def remove_empty(list):
-            return [x for x in list if x] if list else []
-        self.name = name
-        self.version = version
-        self.description = description
-        self.details = details
-        self.warnings = remove_empty(warnings)
-        self.nixos = nixos
-        self.stdenv = stdenv
-        self.folder_name = folder_name or name
-        self.required_projects = required_projects
-        self.nix_packages = remove_empty(nix_packages)
-        self.vars_to_keep = remove_empty(vars_to_keep)
-        self.download_url = download_url
-        self.git_url = git_url
-        self.git_branch = git_branch
-        self.download_commands = remove_empty(download_commands)
-        self.patch_commands = remove_empty(patch_commands)
-        self.patch_url = patch_url
-        self.shell_hook_commands = remove_empty(shell_hook_commands)
-        self.setenv_commands = remove_empty(setenv_commands)
-        self.build_commands = remove_empty(build_commands)
-        self.clean_commands = remove_empty(clean_commands)
-        self.smoke_test_commands = remove_empty(smoke_test_commands)
-        self.test_commands = remove_empty(test_commands)
-        self.potential_build_inputs = potential_build_inputs or [ "src/*", "*.cc", "*.cxx", "*.c", "*.h", "*.hpp", "*.hh", "*.msg", "Makefile", "*/Makefile", "makefrag", "*/makefrag" ]
-        self.potential_build_outputs = potential_build_outputs or [ "out/*", "*.o", "*.a", "*.a.*", "*.so", "*.so.*", "*.dylib", "*.dylib.*", "*.dll", "*.exe", ":noext" ]
-        self.options = options or {}
-        self.metadata = metadata or {}  # examples: catalog_url, release_year, original_version
+            if callable(list):
+                return list  # deferred, see __getattr__
+            return intern_tuple(x for x in list if x) if list else ()
 
         # remove null elements from lists inside options, too
-        for option_name, option_entries in self.options.items():
+        normalized_options = {}
+        for option_name, option_entries in (options or {}).items():
+            normalized_options[option_name] = {}
             for field_name, field_value in option_entries.items():
-                if not re.match("option_", field_name) and not hasattr(self, field_name):
+                if not re.match("option_", field_name) and field_name not in self.FIELDS:
                     raise ValueError(f"Project {name}-{version} option '{option_name}' key '{field_name}': Invalid key")
-                if type(field_value) is list:
+                if type(field_value) in (list, tuple):
                     if (field_value[0] or "") not in ["@prepend", "@append", "@replace"]:
                         raise ValueError(f"Project {name}-{version} option '{option_name}' key '{field_name}': First value of list must be '@prepend', '@append', or '@replace'")
-                    field_value[:] = remove_empty(field_value)
+                    field_value = remove_empty(field_value)
+                normalized_options[option_name][field_name] = field_value
 
-        if self.description and "\n" in self.description:
+        if change_tracking and change_tracking not in ChangeTrackingFilter.POLICIES:
+            raise ValueError(f"Project {name}-{version}: invalid change_tracking value '{change_tracking}', must be one of: {', '.join(ChangeTrackingFilter.POLICIES)}")
+        if description and "\n" in description:
             raise Exception(f"project {name}-{version}: description may not contain newlines -- use the details field to store additional information")
-        if self.description and len(self.description) > 180:
-            raise Exception(f"project {name}-{version}: description may not be longer than 180 characters (currently {len(self.description)}) -- use the details field to store additional information")
+        if description and len(description) > 180:
+            raise Exception(f"project {name}-{version}: description may not be longer than 180 characters (currently {len(description)}) -- use the details field to store additional information")
+
+        self._set_fields(
+            name = name,
+            version = version,
+            description = description,
+            details = details,
+            warnings = remove_empty(warnings),
+            nixos = nixos,
+            stdenv = stdenv,
+            folder_name = folder_name or name,
+            required_projects = { project_name: intern_tuple(versions) for project_name, versions in required_projects.items() },
+            nix_packages = remove_empty(nix_packages),
+            vars_to_keep = remove_empty(vars_to_keep),
+            download_url = download_url,
+            git_url = git_url,
+            git_branch = git_branch,
+            download_commands = remove_empty(download_commands),
+            patch_commands = remove_empty(patch_commands),
+            patch_url = patch_url,
+            shell_hook_commands = remove_empty(shell_hook_commands),
+            setenv_commands = remove_empty(setenv_commands),
+            build_commands = remove_empty(build_commands),
+            clean_commands = remove_empty(clean_commands),
+            smoke_test_commands = remove_empty(smoke_test_commands),
+            test_commands = remove_empty(test_commands),
+            potential_build_inputs = intern_tuple(potential_build_inputs or self.DEFAULT_POTENTIAL_BUILD_INPUTS),
+            potential_build_outputs = intern_tuple(potential_build_outputs or self.DEFAULT_POTENTIAL_BUILD_OUTPUTS),
+            change_tracking = change_tracking or "skip-outputs",  # which files are covered by the snapshots, see ChangeTrackingFilter
+            options = normalized_options,
+            metadata = metadata or {}  # examples: catalog_url, release_year, original_version
+        )
+
+    def _set_fields(self, **fields):
+        if "version" in fields and type(fields["version"]) is not Version:
+            fields["version"] = Version(fields["version"])
+        deferred_fields = {}
+        for field_name, field_value in fields.items():
+            if callable(field_value) and field_name in self.LIST_FIELDS:
+                deferred_fields[field_name] = field_value
+            else:
+                object.__setattr__(self, field_name, field_value)
+        object.__setattr__(self, "deferred_fields", deferred_fields or None)
+
+    def _get_fields(self, evaluate=True):
+        # with evaluate=False, deferred fields are returned as the functions that compute them
+        deferred_fields = {} if evaluate else self.deferred_fields or {}
+        return {field_name: deferred_fields[field_name] if field_name in deferred_fields else getattr(self, field_name) for field_name in self.FIELDS}
+
+    def __getattr__(self, name):
+        # only called for attributes that are not set, i.e. deferred fields that have not been computed yet
+        if name != "deferred_fields" and self.deferred_fields and name in self.deferred_fields:
+            value = self.deferred_fields[name]()
+            value = intern_tuple(x for x in value if x) if value else ()
+            object.__setattr__(self, name, value)
+            del self.deferred_fields[name]
+            return value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Cannot set '{name}': project descriptions are immutable, use replace() instead")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Cannot delete '{name}': project descriptions are immutable")
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._set_fields(**state)
+
+    def to_dict(self):
+        return self._get_fields()
+
+    def replace(self, **changes):
+        # returns a copy with the given fields changed; the rest is shared with this one
+        for field_name, field_value in changes.items():
+            if field_name not in self.FIELDS:
+                raise AttributeError(f"Project description has no field '{field_name}'")
+            if field_name in self.LIST_FIELDS:
+                changes[field_name] = intern_tuple(field_value)
+        project_description = ProjectDescription.__new__(ProjectDescription)
+        project_description._set_fields(**{**self._get_fields(evaluate=False), **changes})
+        return project_description
+
+    @classmethod
+    def from_compiled(cls, fields):
+        # create from an entry of the compiled database; these were validated and normalized by __init__ at compile time,
+        # only the lists need to be turned back into (interned) tuples
+        project_description = cls.__new__(cls)
+        fields = dict(fields)
+        for field_name in cls.LIST_FIELDS:
+            fields[field_name] = intern_tuple(fields[field_name])
+        fields["required_projects"] = { project_name: intern_tuple(versions) for project_name, versions in fields["required_projects"].items() }
+        fields["options"] = { option_name: { field_name: intern_tuple(field_value) if type(field_value) is list else field_value for field_name, field_value in option_entries.items() }
+                             for option_name, option_entries in fields["options"].items() }
+        project_description._set_fields(**fields)
+        return project_description
 
     def __repr__(self):
         return self.get_full_name()
@@ -763,6 +1244,18 @@ class ProjectDescription:
         return [option_name for option_name, option_entries in self.options.items() if option_entries.get("option_is_default")]
 
     def activate_project_options(self, requested_options, activate_default_options=True, quiet=False):
+        # The result only differs from this description in the fields set by the options, and is memoized,
+        # so that activating the same options again (e.g. for every resolution of the same project) costs nothing.
+        key = (tuple(requested_options or []), activate_default_options)
+        activated_copies = getattr(self, "activated_copies", None)
+        if activated_copies is None:
+            activated_copies = {}
+            object.__setattr__(self, "activated_copies", activated_copies)
+        if key not in activated_copies:
+            activated_copies[key] = self._activate_project_options(requested_options, activate_default_options, quiet)
+        return activated_copies[key]
+
+    def _activate_project_options(self, requested_options, activate_default_options, quiet):
         def get_conflicting_options(the_option_name, option_names):
             return [o for o in option_names if the_option_name != o and self.options[o].get("option_category") == self.options[the_option_name].get("option_category")]
 
@@ -780,20 +1273,21 @@ class ProjectDescription:
                 if not get_conflicting_options(option, effective_options):
                     effective_options.append(option)
 
-        new_project_description = copy.deepcopy(self)
+        changes = {}
 
-        def set_or_extend_attr_from_option(project_description, field_name, field_value):
-            # Modify the attribute in the project description: if it's a list, extend or replace based on the first element of field_value; otherwise overwrite it
-            if hasattr(project_description, field_name) and isinstance(getattr(project_description, field_name), list):
-                assert isinstance(field_value, list) and field_value[0] in ["@prepend", "@append", "@replace"]
+        def set_or_extend_attr_from_option(field_name, field_value):
+            # Compute the new value of the field: if it's a list, extend or replace based on the first element of field_value; otherwise overwrite it
+            current_value = changes[field_name] if field_name in changes else getattr(self, field_name)
+            if isinstance(current_value, tuple):
+                assert isinstance(field_value, tuple) and field_value[0] in ["@prepend", "@append", "@replace"]
                 if field_value[0] == "@prepend":
-                    getattr(project_description, field_name)[:0] = field_value[1:]
+                    changes[field_name] = field_value[1:] + current_value
                 elif field_value[0] == "@append":
-                    getattr(project_description, field_name).extend(field_value[1:])
+                    changes[field_name] = current_value + field_value[1:]
                 elif field_value[0] == "@replace":
-                    setattr(project_description, field_name, field_value[1:])
+                    changes[field_name] = field_value[1:]
             else:
-                setattr(project_description, field_name, field_value)
+                changes[field_name] = field_value
 
         if effective_options:
             if not quiet:
@@ -802,10 +1296,10 @@ class ProjectDescription:
                 if option in self.options:
                     for field_name, field_value in self.options[option].items():
                         if not re.match("option_", field_name): # not option metadata
-                            set_or_extend_attr_from_option(new_project_description, field_name, field_value)
+                            set_or_extend_attr_from_option(field_name, field_value)
                 else:
                     _logger.warning(f"Project {cyan(self)} does not support option {cyan(option)}")
-        return new_project_description
+        return self.replace(**changes) if changes else self
 
 class ProjectReference:
     def __init__(self, name, version):
@@ -826,65 +1320,444 @@ class ProjectReference:
     def get_full_name(self):
         return self.name + "-" + self.version if self.version else self.name
 
+class ResolutionStats:
+    """Counters describing one run of the dependency resolver (see ProjectRegistry._iter_valid_combinations()),
+    for --explain-resolution and for benchmarks."""
+
+    def __init__(self, requested_project_names):
+        self.requested_project_names = list(requested_project_names)
+        self.candidate_counts = {}  # project name -> (number of versions, number of candidate versions)
+        self.num_examined = 0  # candidate versions tried while building combinations
+        self.num_skipped = 0  # candidate versions skipped because they are incompatible with earlier choices
+        self.num_rejected = {}  # constraint -> number of candidate versions (or choices) it rejected
+        self.num_found = 0  # combinations produced
+        self.search_time = 0.0  # seconds spent in the search, excluding the time of the consumer
+        self.total_time = None  # seconds spent in compute_effective_project_descriptions(), if that was the caller
+
+    def reject(self, constraint, count=1):
+        if count:
+            self.num_rejected[constraint] = self.num_rejected.get(constraint, 0) + count
+
+    @staticmethod
+    def combine(stats_list):
+        # sum of the counters of several resolver runs
+        result = ResolutionStats([])
+        for stats in stats_list:
+            result.num_examined += stats.num_examined
+            result.num_skipped += stats.num_skipped
+            for constraint, count in stats.num_rejected.items():
+                result.reject(constraint, count)
+            result.num_found += stats.num_found
+            result.search_time += stats.search_time
+        return result
+
+    def get_report_lines(self):
+        lines = []
+        for project_name, (num_versions, num_candidates) in self.candidate_counts.items():
+            lines.append(f"{project_name}: {num_versions} versions, {num_candidates} candidates")
+        lines.append(f"{self.num_examined} candidate versions examined, {self.num_skipped} skipped as incompatible with earlier choices, {self.num_found} combinations found")
+        for constraint, count in self.num_rejected.items():
+            lines.append(f"rejected by {constraint}: {count}")
+        timing = f"search time: {self.search_time * 1000:.1f} ms"
+        if self.total_time is not None:
+            timing += f", total time in compute_effective_project_descriptions: {self.total_time * 1000:.1f} ms"
+        lines.append(timing)
+        return lines
+
 class ProjectRegistry:
-    def __init__(self):
-        self.all_project_descriptions = self.collect_project_descriptions()
-        self.index = self.build_index(self.all_project_descriptions)
-
-    def collect_project_descriptions(self):
-        python_files = [
-            "omnetpp",
-            "inet",
-            "veins",
-            "simulte",
-            "simu5g",
-            "external",
-            "testproject"
-        ]
+    # Database sources, in the order their projects are listed. Python modules are referred to by module name,
+    # JSON files by file name. The MANIFEST_FILE maps project names to the source that defines them,
+    # so that only the sources that are actually needed have to be loaded.
+    DATABASE_PYTHON_MODULES = [
+        "omnetpp",
+        "inet",
+        "veins",
+        "simulte",
+        "simu5g",
+        "external",
+        "testproject"
+    ]
 
-        json_files = [
-            "external.json"
-        ]
+    DATABASE_JSON_FILES = [
+        "external.json"
+    ]
 
-        all_project_descriptions = []
-        for fname in python_files:
-            module = importlib.import_module("opp_env.database." + fname)
-            raw_project_descriptions = module.get_project_descriptions()
-            project_descriptions = [ProjectDescription(**e) for e in raw_project_descriptions]
-            all_project_descriptions += project_descriptions
+    MANIFEST_FILE = "manifest.json"
+
+    # The expanded and validated descriptions of all sources, produced by 'opp_env maint --compile-database' (not under
+    # version control, but included in the distribution). Sources are stored once per COMPILED_DATABASE_PLATFORMS entry,
+    # or under "*" if they are the same for all of them.
+    COMPILED_DATABASE_FILE = "compiled.json"
+    COMPILED_DATABASE_PLATFORMS = [("Linux", "x86_64"), ("Linux", "aarch64"), ("Darwin", "x86_64"), ("Darwin", "arm64")]
+
+    # increment when the structure of the pickled snapshots or the compiled database changes
+    SNAPSHOT_FORMAT_VERSION = 5
+
+    def __init__(self, use_snapshot_cache=True, use_compiled_database=True):
+        self.use_snapshot_cache = use_snapshot_cache
+        self.use_compiled_database = use_compiled_database
+        self.manifest = None
+        self.compiled_database = None
+        self.snapshot_dir_touched = False
+        self.content_hash = None
+        self.fingerprint = None
+        self.project_descriptions_by_source = {}  # source -> list of descriptions; filled in lazily
+        self.all_project_descriptions = None  # only computed when all sources are loaded
+        self.all_project_names = None  # ditto
+        self.index = {}
+        self.version_prefix_index = {}
+        self.project_versions_by_name = {}  # name -> list of descriptions, in database order
+        self.version_positions = {}  # name -> {version: index in project_versions_by_name[name]}; filled in lazily
+        self.compatibility_masks = None  # see get_compatibility_masks()
+        self.compatibility_masks_modified = False
+        self.resolution_stats = None  # ResolutionStats of each resolver run, while collecting them (see collect_resolution_stats())
+
+    @staticmethod
+    def get_database_directory():
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), "database")
 
-        for fname in json_files:
-            with open(os.path.join(os.path.dirname(os.path.realpath(__file__)), "database", fname)) as f:
-                all_project_descriptions += [ProjectDescription(**e) for e in json.load(f)]
+    def get_database_sources(self):
+        return self.DATABASE_PYTHON_MODULES + self.DATABASE_JSON_FILES
 
-        # expand to wildcard versions such as "4.2.*" to list of matching versions
-        return [self.expand_wildcards_in_project_dependencies(p, all_project_descriptions) for p in all_project_descriptions]
+    def get_database_files(self):
+        database_dir = self.get_database_directory()
+        return [os.path.join(database_dir, fname + ".py") for fname in self.DATABASE_PYTHON_MODULES] + \
+               [os.path.join(database_dir, fname) for fname in self.DATABASE_JSON_FILES]
+
+    def get_manifest(self):
+        # project name -> database source; a missing or outdated manifest only costs performance (see _load_project)
+        if self.manifest is None:
+            try:
+                with open(os.path.join(self.get_database_directory(), self.MANIFEST_FILE)) as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                _logger.debug(f"Could not read project database manifest: {e}")
+                self.manifest = {}
+        return self.manifest
+
+    def compute_manifest(self):
+        manifest = {}
+        for source in self.get_database_sources():
+            for project_description in self._load_source(source):
+                if manifest.get(project_description.name, source) != source:
+                    raise Exception(f"Project '{project_description.name}' is defined in multiple database sources: '{manifest[project_description.name]}' and '{source}'")
+                manifest[project_description.name] = source
+        return manifest
+
+    def update_manifest(self):
+        manifest_file = os.path.join(self.get_database_directory(), self.MANIFEST_FILE)
+        with open(manifest_file, "w") as f:
+            json.dump(self.compute_manifest(), f, indent=4)
+            f.write("\n")
+        _logger.info(f"Updated {cyan(manifest_file)}")
+
+    def compute_database_content_hash(self):
+        # hash of the database files and the code that processes them (this file); independent of the installation location
+        if self.content_hash is None:
+            import hashlib
+            h = hashlib.sha256()
+            h.update(f"{self.SNAPSHOT_FORMAT_VERSION}".encode())
+            for fname in [os.path.realpath(__file__), *self.get_database_files()]:
+                h.update(os.path.basename(fname).encode())
+                with open(fname, "rb") as f:
+                    h.update(f.read())
+            self.content_hash = h.hexdigest()
+        return self.content_hash
+
+    def compute_database_fingerprint(self):
+        # The snapshots must be invalidated whenever anything that affects the expanded project descriptions changes:
+        # the database files, the code that processes them, the opp_env version, and the host platform
+        # (the database factories produce OS and architecture specific entries).
+        if self.fingerprint is None:
+            import hashlib
+            import platform
+            h = hashlib.sha256()
+            h.update(f"{self.compute_database_content_hash()};{get_version()};{sys.version_info[:2]};{platform.system()};{platform.machine()}".encode())
+            self.fingerprint = h.hexdigest()
+        return self.fingerprint
+
+    @staticmethod
+    def get_platform_key(system, machine):
+        return f"{system}-{machine}"
+
+    def get_compiled_database(self):
+        # source -> raw project descriptions for the host platform; empty if the compiled database is missing
+        # or does not match the database files (typical in development installs)
+        if self.compiled_database is None:
+            import platform
+            self.compiled_database = {}
+            compiled_database_file = os.path.join(self.get_database_directory(), self.COMPILED_DATABASE_FILE)
+            try:
+                with open(compiled_database_file) as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                _logger.debug(f"No compiled project database, evaluating the database sources instead")
+                return self.compiled_database
+            except Exception as e:
+                _logger.debug(f"Could not read compiled project database {cyan(compiled_database_file)}: {e}")
+                return self.compiled_database
+            if data.get("content_hash") != self.compute_database_content_hash():
+                _logger.debug(f"Compiled project database {cyan(compiled_database_file)} is out of date, ignoring it")
+                return self.compiled_database
+            platform_key = self.get_platform_key(platform.system(), platform.machine())
+            for source, entries_by_platform in data["sources"].items():
+                entries = entries_by_platform.get("*", entries_by_platform.get(platform_key))
+                if entries is not None:
+                    self.compiled_database[source] = entries
+        return self.compiled_database
+
+    def compile_database(self):
+        # Evaluate all sources for all supported platforms, with validation and wildcard expansion
+        # done here once, instead of at every startup. The platform is simulated by overriding the
+        # functions of the 'platform' module that the database factories use.
+        import platform
+        sources = {}
+        original_functions = platform.system, platform.machine
+        try:
+            for system, machine in self.COMPILED_DATABASE_PLATFORMS:
+                platform.system, platform.machine = (lambda: system), (lambda: machine)
+                registry = ProjectRegistry(use_snapshot_cache=False, use_compiled_database=False)
+                registry.compute_manifest()  # checks for projects defined in multiple sources
+                for source in registry.get_database_sources():
+                    entries = [project_description.to_dict() for project_description in registry._load_source(source)]
+                    sources.setdefault(source, {})[self.get_platform_key(system, machine)] = entries
+        finally:
+            platform.system, platform.machine = original_functions
+        for source, entries_by_platform in sources.items():
+            all_entries = list(entries_by_platform.values())
+            if all(entries == all_entries[0] for entries in all_entries):
+                sources[source] = {"*": all_entries[0]}
+        return {
+            "content_hash": self.compute_database_content_hash(),
+            "sources": sources,
+        }
+
+    def update_compiled_database(self):
+        compiled_database_file = os.path.join(self.get_database_directory(), self.COMPILED_DATABASE_FILE)
+        data = self.compile_database()
+        with open(compiled_database_file, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.write("\n")
+        _logger.info(f"Updated {cyan(compiled_database_file)}")
+
+    @staticmethod
+    def get_snapshot_root_directory():
+        return os.path.join(get_cache_directory(), "project_registry")
+
+    # snapshot directories of other fingerprints (e.g. older opp_env versions, or other installations sharing the
+    # cache directory) are only removed after they have not been used for this long
+    SNAPSHOT_MAX_UNUSED_AGE = 30 * 24 * 3600
+
+    def get_snapshot_file_name(self, name):
+        # one snapshot file per source (so that sources can be loaded independently of each other), plus
+        # files for derived data like the compatibility matrix
+        return os.path.join(self.get_snapshot_root_directory(), self.compute_database_fingerprint()[:32], name + ".pickle")
+
+    def load_snapshot(self, source):
+        return self.load_cache_file(source, "project_descriptions")
+
+    def save_snapshot(self, source, project_descriptions):
+        self.save_cache_file(source, "project_descriptions", project_descriptions)
+
+    def load_cache_file(self, name, key):
+        import pickle
+        snapshot_file = self.get_snapshot_file_name(name)
+        try:
+            with open(snapshot_file, "rb") as f:
+                data = pickle.load(f)
+            if data.get("fingerprint") != self.compute_database_fingerprint():
+                _logger.debug(f"Project registry snapshot {cyan(snapshot_file)} is out of date, ignoring it")
+                return None
+            if not self.snapshot_dir_touched:
+                # mark the directory as used, see remove_stale_snapshot_directories()
+                self.snapshot_dir_touched = True
+                try:
+                    os.utime(os.path.dirname(snapshot_file))
+                except OSError:
+                    pass
+            return data[key]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _logger.debug(f"Could not load project registry snapshot {cyan(snapshot_file)}: {e}")
+            return None
+
+    def save_cache_file(self, name, key, value):
+        # write to a temp file and rename it, so that concurrently running opp_env processes never see a partial file
+        import pickle
+        import tempfile
+        snapshot_file = self.get_snapshot_file_name(name)
+        try:
+            snapshot_dir = os.path.dirname(snapshot_file)
+            if not os.path.isdir(snapshot_dir):
+                # a new fingerprint: a good time to clean up after the previous ones
+                self.remove_stale_snapshot_directories()
+                os.makedirs(snapshot_dir, exist_ok=True)
+            data = {
+                "fingerprint": self.compute_database_fingerprint(),
+                key: value,
+            }
+            fd, temp_file = tempfile.mkstemp(dir=snapshot_dir, prefix="." + name + ".")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_file, snapshot_file)
+            except BaseException:
+                os.remove(temp_file)
+                raise
+            _logger.debug(f"Saved project registry snapshot {cyan(snapshot_file)}")
+        except Exception as e:
+            _logger.debug(f"Could not save project registry snapshot {cyan(snapshot_file)}: {e}")
+
+    def remove_stale_snapshot_directories(self):
+        # Removes the snapshot directories of other fingerprints that have not been used recently. Directories that are
+        # still in use are left alone, because other opp_env installations may share the cache directory.
+        import shutil
+        import time
+        snapshot_root = self.get_snapshot_root_directory()
+        current_dir_name = os.path.basename(os.path.dirname(self.get_snapshot_file_name("-")))
+        try:
+            entries = list(os.scandir(snapshot_root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.name != current_dir_name and entry.is_dir(follow_symlinks=False) and time.time() - entry.stat().st_mtime > self.SNAPSHOT_MAX_UNUSED_AGE:
+                    _logger.debug(f"Removing stale project registry snapshot directory {cyan(entry.path)}")
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
+
+    def _evaluate_source(self, source):
+        if source in self.DATABASE_JSON_FILES:
+            with open(os.path.join(self.get_database_directory(), source)) as f:
+                return [ProjectDescription(**e) for e in json.load(f)]
+        else:
+            module = importlib.import_module("opp_env.database." + source)
+            raw_project_descriptions = module.get_project_descriptions()
+            return [ProjectDescription(**e) for e in raw_project_descriptions]
+
+    def _load_source(self, source):
+        if source in self.project_descriptions_by_source:
+            return self.project_descriptions_by_source[source]
+        compiled_entries = self.get_compiled_database().get(source) if self.use_compiled_database else None
+        if compiled_entries is not None:
+            # already validated and expanded
+            _logger.debug(f"Loaded project database source {cyan(source)} from the compiled database")
+            project_descriptions = [ProjectDescription.from_compiled(e) for e in compiled_entries]
+            self._register_source(source, project_descriptions)
+            return project_descriptions
+        project_descriptions = self.load_snapshot(source) if self.use_snapshot_cache else None
+        from_snapshot = project_descriptions is not None
+        if from_snapshot:
+            _logger.debug(f"Loaded project database source {cyan(source)} from snapshot")
+        else:
+            _logger.debug(f"Evaluating project database source {cyan(source)}")
+            project_descriptions = self._evaluate_source(source)
+        # register before expanding wildcards, because expansion may need to load further sources (which may refer back to this one)
+        self._register_source(source, project_descriptions)
+        if not from_snapshot:
+            # expand to wildcard versions such as "4.2.*" to list of matching versions, and re-register the updated descriptions
+            project_descriptions = [self.expand_wildcards_in_project_dependencies(p) for p in project_descriptions]
+            self._register_source(source, project_descriptions)
+            if self.use_snapshot_cache:
+                self.save_snapshot(source, project_descriptions)
+        return project_descriptions
+
+    def _register_source(self, source, project_descriptions):
+        index, version_prefix_index, project_versions_by_name = self.build_index(project_descriptions)
+        # a source may be re-registered with updated descriptions, but a project must not be defined by two sources
+        previous_project_names = {p.name for p in self.project_descriptions_by_source.get(source, [])}
+        for project_name in (project_versions_by_name.keys() & self.project_versions_by_name.keys()) - previous_project_names:
+            other_source = next(other for other, descriptions in self.project_descriptions_by_source.items() if any(p.name == project_name for p in descriptions))
+            raise Exception(f"Project '{project_name}' is defined in multiple database sources: '{other_source}' and '{source}'")
+        self.project_descriptions_by_source[source] = project_descriptions
+        self.index.update(index)
+        self.version_prefix_index.update(version_prefix_index)
+        self.project_versions_by_name.update(project_versions_by_name)
+
+    def _load_project(self, project_name):
+        # make sure the descriptions of the given project are loaded; unknown projects cause all sources to be loaded
+        if project_name in self.index:
+            return
+        source = self.get_manifest().get(project_name)
+        if source in self.get_database_sources():
+            self._load_source(source)
+        if project_name not in self.index:
+            self.get_all_project_descriptions()
+
+    def get_memory_usage(self):
+        # approximate memory used by the loaded project descriptions, in bytes; objects shared between descriptions
+        # (interned tuples and strings) are only counted once
+        seen = set()
+        total = 0
+        todo = [p for project_descriptions in self.project_descriptions_by_source.values() for p in project_descriptions]
+        while todo:
+            obj = todo.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+            if isinstance(obj, ProjectDescription):
+                todo += [value for value in obj._get_fields(evaluate=False).values() if not callable(value)]
+            elif isinstance(obj, dict):
+                todo += [*obj.keys(), *obj.values()]
+            elif isinstance(obj, (list, tuple)):
+                todo += obj
+        return total
+
+    def log_memory_usage(self):
+        num_project_descriptions = sum(len(project_descriptions) for project_descriptions in self.project_descriptions_by_source.values())
+        _logger.debug(f"Project registry: {num_project_descriptions} project descriptions loaded from {len(self.project_descriptions_by_source)} sources, using about {self.get_memory_usage() // 1024} KiB")
 
     def get_all_project_descriptions(self):
+        if self.all_project_descriptions is None:
+            self.all_project_descriptions = [p for source in self.get_database_sources() for p in self._load_source(source)]
         return self.all_project_descriptions
 
+    def has_project(self, project_name):
+        self._load_project(project_name)
+        return project_name in self.index
+
     def get_project_names(self, project_descriptions=None):
-        return uniq([p.name for p in project_descriptions or self.get_all_project_descriptions()])
+        if project_descriptions:
+            return uniq([p.name for p in project_descriptions])
+        if self.all_project_names is None:
+            self.all_project_names = uniq([p.name for p in self.get_all_project_descriptions()])
+        return list(self.all_project_names)
 
     def get_project_versions(self, project_name, project_descriptions=None):
-        return [p for p in project_descriptions or self.get_all_project_descriptions() if p.name == project_name]
+        if project_descriptions:
+            return [p for p in project_descriptions if p.name == project_name]
+        self._load_project(project_name)
+        return list(self.project_versions_by_name.get(project_name, []))
 
     def get_project_version_names(self, project_name, project_descriptions=None):
         # Note: this does not include "pseudo" versions like "latest", or "omnetpp-4" that means "omnetpp-4.6.1"
-        return [p.version for p in project_descriptions or self.get_all_project_descriptions() if p.name == project_name]
+        if project_descriptions:
+            return [p.version for p in project_descriptions if p.name == project_name]
+        self._load_project(project_name)
+        return [p.version for p in self.project_versions_by_name.get(project_name, [])]
 
     def build_index(self, project_descriptions):
         # index structure: { name: {version: description}}
+        # version_prefix_index structure: { name: (versions, sorted_versions, positions) }, where versions are in database order,
+        # sorted_versions are the same sorted as plain strings (so that versions with a common prefix are adjacent),
+        # and positions[i] is the index of sorted_versions[i] in versions
+        # project_versions_by_name structure: { name: [description, ...] }, in database order
         index = {}
         versions = {}
+        project_versions_by_name = {}
         for project in project_descriptions:
             project_name = project.name
             project_version = project.version
             if project_name not in index:
                 index[project_name] = {}
                 versions[project_name] = []
+                project_versions_by_name[project_name] = []
             index[project_name][project_version] = project
             versions[project_name].append(project_version)
+            project_versions_by_name[project_name].append(project)
 
         # add meta entries: "latest"; "3", "3.8" -> 3.8.2 (latest minor/patch version)
         # ordering is determined by order of items in the project_descriptions array.
@@ -897,17 +1770,44 @@ class ProjectRegistry:
                     truncated_version = truncated_version.rsplit(".",1)[0] # chop off part after last dot
                     if truncated_version not in index[project_name]:
                         index[project_name][truncated_version] = index[project_name][version]
-        return index
+
+        version_prefix_index = {}
+        for project_name, project_versions in versions.items():
+            positions = sorted(range(len(project_versions)), key=lambda i: str(project_versions[i]))
+            version_prefix_index[project_name] = (project_versions, [str(project_versions[i]) for i in positions], positions)
+        return index, version_prefix_index, project_versions_by_name
+
+    def get_matching_project_version_names(self, project_name, wildcard_version):
+        # Returns the versions of the project that match the given version pattern like "4.2.*" (see version_matches),
+        # in database order. The candidates are the versions that start with the pattern without the ".*" suffix;
+        # these form a contiguous range in the sorted versions, so they can be found by bisection.
+        import bisect
+        check_version_pattern(wildcard_version)
+        self._load_project(project_name)
+        if project_name not in self.version_prefix_index:
+            return []
+        versions, sorted_versions, positions = self.version_prefix_index[project_name]
+        is_wildcard = wildcard_version.endswith(".*")
+        prefix = str(wildcard_version[:-2] if is_wildcard else wildcard_version)
+        matching_positions = []
+        for i in range(bisect.bisect_left(sorted_versions, prefix), len(sorted_versions)):
+            version = sorted_versions[i]
+            if not version.startswith(prefix):
+                break
+            if version == prefix or (is_wildcard and (version.startswith(prefix+".") or version.startswith(prefix+"p"))):
+                matching_positions.append(positions[i])
+        return [versions[i] for i in sorted(matching_positions)]
 
     def get_project_version_aliases(self, project_reference):
         # collect version aliases for a given project; e.g. if project_reference is "omnetpp-6.0.2", then it may return ["6", "6.0", "latest"]
+        self._load_project(project_reference.name)
         version_to_project_dict = self.index[project_reference.name]
         return [v for v,p in version_to_project_dict.items() if p.version != v and p.version == project_reference.version]
 
     def get_project_description(self, project_reference):
         if type(project_reference) is str:
             project_reference = ProjectReference.parse(project_reference)
-        if project_reference.name not in self.index:
+        if not self.has_project(project_reference.name):
             raise Exception(f"Cannot resolve '{project_reference}': " + self.get_unknown_project_message(project_reference.name))
         if not project_reference.version:
             raise Exception(f"Which version of '{project_reference.name}' do you mean? (Use '{project_reference.name}-latest' for latest version)")
@@ -918,56 +1818,227 @@ class ProjectRegistry:
             _logger.debug(f"Resolved {cyan(project_reference)} as {cyan(project_description)}")
         return project_description
 
-    def expand_wildcards_in_project_dependencies(self, project_description, all_project_descriptions):
-        def expand(project_name, version, all_project_descriptions):
+    def expand_wildcards_in_project_dependencies(self, project_description):
+        # returns an updated copy of the project description
+        def expand(project_name, version):
             if not '*' in version:
                 return [ version ]
-            candidates = self.get_project_version_names(project_name, all_project_descriptions)
-            return [ candidate for candidate in candidates if version_matches(version, candidate) ]
+            return self.get_matching_project_version_names(project_name, version)
 
-        def expand_all(project_name, versions, all_project_descriptions):
+        def expand_all(project_name, versions):
             result = []
             for version in versions:
-                result += expand(project_name, version, all_project_descriptions)
+                result += expand(project_name, version)
             return result
 
-        project_description.required_projects = { project_name: expand_all(project_name, versions, all_project_descriptions)
-            for project_name, versions in project_description.required_projects.items() }
-
-        return project_description
+        return project_description.replace(required_projects = { project_name: intern_tuple(expand_all(project_name, versions))
+            for project_name, versions in project_description.required_projects.items() })
 
-    def compute_effective_project_descriptions(self, specified_project_descriptions, requested_options=None):
-        selected_project_descriptions = self.expand_dependencies(specified_project_descriptions)
-        if not selected_project_descriptions:
-            project_names = [ p.name for p in specified_project_descriptions ]
-            raise Exception(f"The specified project versions cannot be installed together due to incompatible dependencies. Use the `opp_env list --matching {' '.join(project_names)}` command to see the compatible version combinations.")
-        return activate_project_options(selected_project_descriptions, requested_options)
+    def collect_resolution_stats(self):
+        # from now on, record the statistics of the resolver runs in resolution_stats (for --explain-resolution)
+        if self.resolution_stats is None:
+            self.resolution_stats = []
 
-    def expand_dependencies(self, specified_project_descriptions, return_all=False):
+    def compute_effective_project_descriptions(self, specified_project_descriptions, requested_options=None, explain=False, preferred_project_descriptions=None):
+        import time
+        start_time = time.perf_counter()
+        if explain:
+            self.collect_resolution_stats()
+        num_runs = len(self.resolution_stats) if explain else None
+        try:
+            selected_project_descriptions = self.expand_dependencies(specified_project_descriptions, preferred_project_descriptions=preferred_project_descriptions)
+            if not selected_project_descriptions:
+                raise Exception(f"The specified project versions cannot be installed together due to incompatible dependencies: {self.explain_conflict(specified_project_descriptions)}")
+            if explain and preferred_project_descriptions:
+                self.log_preferred_combination(specified_project_descriptions, selected_project_descriptions, preferred_project_descriptions)
+            return activate_project_options(selected_project_descriptions, requested_options)
+        finally:
+            if explain and len(self.resolution_stats) > num_runs:
+                stats = self.resolution_stats[num_runs]  # later runs (if any) are from explain_conflict() or log_preferred_combination()
+                stats.total_time = time.perf_counter() - start_time
+                self.log_resolution_stats(stats, f"Dependency resolution for {cyan(' '.join(p.get_full_name() for p in specified_project_descriptions))}")
+
+    def explain_conflict(self, specified_project_descriptions):
+        # Explains why the specified project versions cannot be used together: names a minimal subset of them that is
+        # already conflicting, with their requirements, and suggests the nearest valid combination, i.e. one where
+        # the version of one conflicting project is replaced by the closest version (in database order) that works.
+        def has_valid_combination(project_descriptions):
+            return next(self.iter_dependency_expansions(project_descriptions), None) is not None
+
+        # drop projects from the conflicting set one by one, as long as the rest still conflicts
+        conflict = list(specified_project_descriptions)
+        for project_description in list(conflict):
+            rest = [p for p in conflict if p is not project_description]
+            if rest and not has_valid_combination(rest):
+                conflict = rest
+
+        def format_requirement(project_description, name):
+            versions = project_description.required_projects[name]
+            if len(versions) <= 5:
+                return f"{project_description.get_full_name()} requires {name} in {{{', '.join(versions)}}}"
+            return f"{project_description.get_full_name()} requires {name} in {{{', '.join(versions[:2])}, ..., {versions[-1]}}} ({len(versions)} versions)"
+
+        # report only the constraints that rule out the conflicting versions: first the requirements that exclude another
+        # one of them, then the dependencies for which their requirements do not overlap
+        reasons = [f"{format_requirement(p, q.name)}, which excludes {q.get_full_name()}"
+                   for p in conflict for q in conflict if q.name in p.required_projects and q.version not in p.required_projects[q.name]]
+        shared_dependency_names = uniq([name for p in conflict for name in p.required_projects if sum(name in q.required_projects for q in conflict) > 1])
+        if not reasons:
+            for name in shared_dependency_names:
+                requiring = [p for p in conflict if name in p.required_projects]
+                if not set.intersection(*[set(p.required_projects[name]) for p in requiring]):
+                    reasons.append(f"{' and '.join(format_requirement(p, name) for p in requiring)}, which do not overlap")
+        if not reasons:
+            # the conflict is further down the dependency chain: show the requirements that are involved in it
+            names = shared_dependency_names if len(conflict) > 1 else list(conflict[0].required_projects)
+            reasons = [format_requirement(p, name) for name in names for p in conflict if name in p.required_projects]
+        explanation = f"{' and '.join(p.get_full_name() for p in conflict)} {'conflict' if len(conflict) > 1 else 'cannot be satisfied'}"
+        if reasons:
+            explanation += f" ({'; '.join(reasons)})"
+
+        def get_versions_by_distance(project_description):
+            versions = self.get_project_version_names(project_description.name)
+            position = self.get_version_position(project_description)
+            return [versions[i] for i in sorted(range(len(versions)), key=lambda i: abs(i - position))]
+
+        nearest_combination = None
+        nearest_distance = None
+        for project_description in reversed(conflict):  # on ties, prefer changing the projects specified later
+            position = self.get_version_position(project_description)
+            requested_projects_versions = OrderedDict((p.name, [p.version]) for p in specified_project_descriptions)
+            requested_projects_versions[project_description.name] = get_versions_by_distance(project_description)[1:]
+            combination = next(self._iter_valid_combinations(requested_projects_versions), None)
+            if combination is not None:
+                replacement = next(p for p in combination if p.name == project_description.name)
+                distance = abs(self.get_version_position(replacement) - position)
+                if nearest_distance is None or distance < nearest_distance:
+                    nearest_distance = distance
+                    nearest_combination = [replacement if p is project_description else p for p in specified_project_descriptions]
+        if nearest_combination is None:
+            # changing a single version is not enough: let all of them change, preferring the projects specified first
+            requested_projects_versions = OrderedDict((p.name, get_versions_by_distance(p)) for p in specified_project_descriptions)
+            combination = next(self._iter_valid_combinations(requested_projects_versions), None)
+            if combination is not None:
+                nearest_combination = [p for p in combination if p.name in requested_projects_versions]
+        if nearest_combination:
+            explanation += f". Nearest valid combination: {' '.join(p.get_full_name() for p in nearest_combination)}"
+        else:
+            explanation += f". Use the `opp_env list --matching {' '.join(p.name for p in specified_project_descriptions)}` command to see the compatible version combinations"
+        return explanation + "."
+
+    def log_resolution_stats(self, stats, title):
+        _logger.info(f"{title}:")
+        for line in stats.get_report_lines():
+            _logger.info(f"  {line}")
+
+    def expand_dependencies(self, specified_project_descriptions, return_all=False, preferred_project_descriptions=None):
+        # preferred_project_descriptions: if given, the versions among them are chosen for the dependencies where possible
+        # (see _select_preferred_combination()), otherwise the normal preference order applies
+        if preferred_project_descriptions and not return_all:
+            return self._select_preferred_combination(specified_project_descriptions, preferred_project_descriptions)
+        combinations = self.iter_dependency_expansions(specified_project_descriptions)
+        if return_all:
+            return list(combinations)
+        return next(combinations, [])
+
+    def _select_preferred_combination(self, specified_project_descriptions, preferred_project_descriptions):
+        # The search tries the preferred versions of each dependency first, so the first combination it finds reuses them
+        # wherever that is compatible with the choices made for the projects before it; like the normal search, it stops
+        # at the first combination instead of enumerating them all. This is a greedy choice: another combination
+        # may reuse more of the preferred versions (see the help of --prefer-installed).
+        requested_projects_versions = OrderedDict((p.name, [p.version]) for p in specified_project_descriptions)
+        preferred_versions = {}
+        for p in preferred_project_descriptions:
+            preferred_versions.setdefault(p.name, set()).add(p.version)
+        return next(self._iter_valid_combinations(requested_projects_versions, preferred_versions), [])
+
+    def log_preferred_combination(self, specified_project_descriptions, combination, preferred_project_descriptions):
+        # for --explain-resolution: tells which versions the preference changed, compared to the default choice
+        default_combination = next(self.iter_dependency_expansions(specified_project_descriptions), [])
+        if combination != default_combination:
+            specified_names = {p.get_full_name() for p in specified_project_descriptions}
+            preferred_names = {p.get_full_name() for p in preferred_project_descriptions}
+            reused = [p.get_full_name() for p in combination if p.get_full_name() in preferred_names and p.get_full_name() not in specified_names]
+            _logger.info(f"Preferring the already installed {cyan(' '.join(reused))} over the default choice {cyan(' '.join(p.get_full_name() for p in default_combination))}")
+
+    def iter_dependency_expansions(self, specified_project_descriptions):
+        # Like expand_dependencies(return_all=True), but returns an iterator that produces the combinations as they are found.
         # note: ordering is important for ensuring that the 1st match contains the highest version numbers of the specified projects
         requested_projects_versions = OrderedDict((p.name, [p.version]) for p in specified_project_descriptions)
-        combinations = self._get_valid_combinations(requested_projects_versions)
-        return combinations if return_all else combinations[0] if combinations else []
+        return self._iter_valid_combinations(requested_projects_versions)
 
-    def _get_valid_combinations(self, requested_projects_versions):
+    def _iter_valid_combinations(self, requested_projects_versions, preferred_versions=None):
         # Find all valid version combinations for the requested projects and their allowed versions, including dependencies.
         # requested_projects_versions: map { project_name : possible_versions_list }
+        # preferred_versions: map { project_name : set of versions }; these versions of the dependencies are tried first
+        # The combinations are generated lazily, in preference order.
+        import time
+        start_time = time.perf_counter()
         project_names = list(requested_projects_versions.keys())
+        stats = ResolutionStats(project_names)
+        if self.resolution_stats is not None:
+            self.resolution_stats.append(stats)
 
         # collect the names of all involved projects (specified + dependencies)
         expanded_project_names = self._expand_with_dependencies(project_names, requested_projects_versions)
 
-        # collect possible versions of all involved projects
+        # collect possible versions of all involved projects, in preference order
         possible_versions = { p: requested_projects_versions.get(p, self.get_project_version_names(p)) for p in expanded_project_names }
-
-        # produce all possible combinations and filter them
-        valid_combinations = []
-        for version_combo in itertools.product(*possible_versions.values()):
-            combination = [self.get_project_description(ProjectReference(proj, version)) for proj, version in zip(expanded_project_names, version_combo)]
-            if self._is_valid_combination(combination):
-                valid_combinations.append(combination)
-
-        return valid_combinations
+        for p, versions in (preferred_versions or {}).items():
+            if p in possible_versions and p not in requested_projects_versions:
+                possible_versions[p] = sorted(possible_versions[p], key=lambda version: version not in versions)  # stable
+        candidates = [[self.get_project_description(ProjectReference(p, version)) for version in possible_versions[p]] for p in expanded_project_names]
+        # a version whose dependencies are not among the involved projects cannot be part of any combination
+        filtered_candidates = [[c for c in cs if all(dep_name in expanded_project_names for dep_name in c.required_projects)] for cs in candidates]
+        for p, cs, filtered_cs in zip(expanded_project_names, candidates, filtered_candidates):
+            num_versions = len(self.get_project_versions(p))
+            stats.candidate_counts[p] = (num_versions, len(filtered_cs))
+            stats.reject("the requested versions", num_versions - len(cs))
+            stats.reject("dependencies outside the involved projects", len(cs) - len(filtered_cs))
+        candidates = filtered_candidates
+
+        # The candidates are represented by their positions in the list of versions of their project, so that the
+        # remaining candidates of each project form a bitset that can be narrowed with the compatibility matrix.
+        project_versions = [self.get_project_versions(p) for p in expanded_project_names]
+        candidate_positions = [[self.get_version_position(c) for c in cs] for cs in candidates]
+        candidate_masks = [sum(1 << i for i in set(positions)) for positions in candidate_positions]
+
+        # Backtracking search: choose a version for each project in turn, and after each choice, drop the versions
+        # of the remaining projects that are incompatible with it. Projects and versions are tried in the same
+        # order as itertools.product() would produce them, so combinations come out in the same (preference) order,
+        # but only the compatible choices are ever enumerated.
+        num_projects = len(expanded_project_names)
+        def solve(combination, remaining_masks):
+            k = len(combination)
+            if k == num_projects:
+                yield list(combination)
+                return
+            for position in candidate_positions[k]:
+                if not remaining_masks[k] >> position & 1:
+                    stats.num_skipped += 1
+                    continue
+                stats.num_examined += 1
+                candidate = project_versions[k][position]
+                next_remaining_masks = remaining_masks[:k + 1]
+                for j in range(k + 1, num_projects):
+                    mask = remaining_masks[j] & self.get_compatibility_mask(candidate, expanded_project_names[j])
+                    if not mask:
+                        # no version of project j is left that could go together with this candidate
+                        stats.reject("the version constraints between {} and {}".format(*sorted([expanded_project_names[k], expanded_project_names[j]])))
+                        break
+                    next_remaining_masks.append(mask)
+                else:
+                    combination.append(candidate)
+                    yield from solve(combination, next_remaining_masks)
+                    combination.pop()
+
+        # the search time excludes the time the consumer spends between combinations
+        for combination in solve([], candidate_masks):
+            stats.num_found += 1
+            stats.search_time += time.perf_counter() - start_time
+            yield combination
+            start_time = time.perf_counter()
+        stats.search_time += time.perf_counter() - start_time
 
     def _expand_with_dependencies(self, project_names, requested_projects_versions):
         queue = list(requested_projects_versions.keys())
@@ -981,20 +2052,55 @@ class ProjectRegistry:
                         queue.append(dep_name)
         return result
 
-    def _is_valid_combination(self, combination):
-        version_map = {proj_desc.name: proj_desc for proj_desc in combination if proj_desc}
-
-        for project_desc in combination:
-            if not project_desc:
-                return False
-            for dep_name, compatible_versions in project_desc.required_projects.items():
-                if dep_name in version_map:
-                    if version_map[dep_name].version not in compatible_versions:
-                        return False
-                else:
-                    return False  # Dependency not included in resolved set
+    @staticmethod
+    def _are_compatible(project_a, project_b):
+        # whether the two versions (of different projects) accept each other as dependency
+        return (project_b.name not in project_a.required_projects or project_b.version in project_a.required_projects[project_b.name]) and \
+               (project_a.name not in project_b.required_projects or project_a.version in project_b.required_projects[project_a.name])
+
+    def get_version_position(self, project_description):
+        # index of the given version in the list of versions of its project (database order)
+        name = project_description.name
+        if name not in self.version_positions:
+            self.version_positions[name] = {p.version: i for i, p in enumerate(self.get_project_versions(name))}
+        return self.version_positions[name][project_description.version]
+
+    def get_compatibility_masks(self):
+        # The compatibility matrix: (name, version, other_name) -> bitset of the versions of the other project
+        # that are compatible with the given project version, bit i standing for the i-th version in database order.
+        # It is filled in lazily, and persisted next to the registry snapshots, so it is computed only once
+        # per database fingerprint.
+        if self.compatibility_masks is None:
+            self.compatibility_masks = (self.load_cache_file("compatibility", "compatibility_masks") if self.use_snapshot_cache else None) or {}
+            self.compatibility_masks_modified = False
+        return self.compatibility_masks
+
+    def get_compatibility_mask(self, project_description, other_project_name):
+        masks = self.get_compatibility_masks()
+        key = (project_description.name, project_description.version, other_project_name)
+        mask = masks.get(key)
+        if mask is None:
+            mask = 0
+            for i, other in enumerate(self.get_project_versions(other_project_name)):
+                if self._are_compatible(project_description, other):
+                    mask |= 1 << i
+            masks[key] = mask
+            self.compatibility_masks_modified = True
+        return mask
+
+    def are_compatible(self, project_descriptions):
+        # whether the given versions (of different projects) pairwise accept each other as dependency
+        for a in project_descriptions:
+            for b in project_descriptions:
+                if a.name != b.name and not self.get_compatibility_mask(a, b.name) >> self.get_version_position(b) & 1:
+                    return False
         return True
 
+    def save_compatibility_masks(self):
+        if self.use_snapshot_cache and self.compatibility_masks_modified:
+            self.save_cache_file("compatibility", "compatibility_masks", self.compatibility_masks)
+            self.compatibility_masks_modified = False
+
     def expand_dependencies_old(self, specified_project_descriptions, return_all=False):
         _logger.debug(f"Computing list of effective projects for {specified_project_descriptions}")
         # 1. collect all required projects ignoring the project versions
@@ -1074,6 +2180,15 @@ class ProjectRegistry:
         else:
             return f"Unknown project '{project_name}'. Did you mean '{most_similar}'?"
 
+_project_registry = None
+
+def get_project_registry():
+    # created on first use, so that commands that don't need the project database don't pay for it
+    global _project_registry
+    if _project_registry is None:
+        _project_registry = ProjectRegistry()
+    return _project_registry
+
 def activate_project_options(project_descriptions, requested_options):
     # check requested options exist at all
     all_supported_options = []
@@ -1119,6 +2234,9 @@ class Workspace:
         if not os.path.exists(opp_env_directory):
             raise Exception(f"'{root_directory}' is not an opp_env workspace, run 'opp_env init' to turn it into one")
         self.nixless = os.path.exists(os.path.join(self.get_workspace_admin_directory(), ".nixless"))  #TODO do it properly!!!
+        self.modification_check_executor = None
+        self.modification_checks = []  # (project_description, future) pairs, see start_modification_check()
+        self.modification_check_report_file = None
 
         extra_nix_packages_file = os.path.join(self.get_workspace_admin_directory(), "extra_nix_packages")
         extra_nix_packages_file_content = self._read_file_if_exists(extra_nix_packages_file).strip()
@@ -1163,6 +2281,7 @@ class Workspace:
                 raise Exception(f"'{dir}' is already an opp_env workspace")
         if re.search("\\s", dir):
             raise Exception(f"Whitespace characters are not allowed in the name and path of the workspace directory")
+        import shutil
         shutil.copytree(os.path.join(os.path.dirname(__file__), "templates", "workspace"), opp_env_dir)
         if nixless:
             # write an empty file called .nixless to indicate that this is a nixless workspace
@@ -1177,14 +2296,91 @@ class Workspace:
             return os.path.isdir(os.path.join(self.root_directory, folder_name, self.PROJECT_ADMIN_DIR))
         def get_project_description(folder_name):
             try:
-                global project_registry
-                return project_registry.get_project_description(folder_name)
+                return get_project_registry().get_project_description(folder_name)
             except Exception as e:
                 _logger.warning(f"Failed to load project description for '{folder_name}': {e}")
                 return None
         result = [get_project_description(folder) for folder in os.listdir(self.root_directory) if is_project(folder)]
         return [p for p in result if p]
 
+    def get_installed_projects_fingerprint(self):
+        # stands for the installed projects and their status (see get_project_status()), but only needs a directory
+        # listing and a stat() per project: the project folders, and the modification times of their state files
+        result = []
+        for folder_name in sorted(os.listdir(self.root_directory)):
+            admin_dir = os.path.join(self.root_directory, folder_name, self.PROJECT_ADMIN_DIR)
+            if os.path.isdir(admin_dir):
+                try:
+                    stat = os.stat(os.path.join(admin_dir, "state"))
+                    result.append(f"{folder_name}:{stat.st_mtime_ns}:{stat.st_size}")
+                except FileNotFoundError:
+                    result.append(f"{folder_name}:-")
+        return result
+
+    RESOLUTION_CACHE_FILE = "resolution_cache.json"
+    RESOLUTION_CACHE_MAX_ENTRIES = 100
+
+    def compute_effective_project_descriptions(self, specified_project_descriptions, requested_options=None, explain=False, prefer_installed=False):
+        # Like ProjectRegistry.compute_effective_project_descriptions(), but the result of the dependency resolution
+        # is remembered in the workspace admin directory, so that repeated invocations with the same arguments (e.g.
+        # 'opp_env run' from scripts) can skip it. The cache key covers everything the result depends on: the
+        # specified projects, the options, the project database, and with prefer_installed, the projects installed
+        # in the workspace. The key is computed without loading project descriptions, as a cache hit needs none.
+        import hashlib
+        project_registry = get_project_registry()
+        key_data = {
+            "projects": [p.get_full_name() for p in specified_project_descriptions],
+            "options": requested_options or [],
+            "prefer_installed": prefer_installed,
+            "database": project_registry.compute_database_fingerprint(),
+            "installed": self.get_installed_projects_fingerprint() if prefer_installed else None,
+        }
+        key = hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+        cache = self._read_resolution_cache()
+        if key in cache:
+            _logger.debug(f"Using the cached dependency resolution result for {cyan(' '.join(key_data['projects']))}")
+            if explain:
+                _logger.info(f"Dependency resolution for {cyan(' '.join(key_data['projects']))}: result taken from the workspace's resolution cache")
+            selected_project_descriptions = [project_registry.get_project_description(ProjectReference.parse(name)) for name in cache[key]]
+            return activate_project_options(selected_project_descriptions, requested_options)
+
+        preferred_project_descriptions = [p for p in self.get_installed_projects() if self.get_project_status(p) == self.DOWNLOADED] if prefer_installed else None
+        effective_project_descriptions = project_registry.compute_effective_project_descriptions(specified_project_descriptions, requested_options, explain=explain, preferred_project_descriptions=preferred_project_descriptions)
+
+        cache.pop(key, None)
+        cache[key] = [p.get_full_name() for p in effective_project_descriptions]
+        while len(cache) > self.RESOLUTION_CACHE_MAX_ENTRIES:
+            del cache[next(iter(cache))]  # drop the oldest entry
+        self._write_resolution_cache(cache)
+        return effective_project_descriptions
+
+    def _read_resolution_cache(self):
+        try:
+            with open(os.path.join(self.get_workspace_admin_directory(), self.RESOLUTION_CACHE_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            _logger.debug(f"Could not read the resolution cache of the workspace, ignoring it: {e}")
+            return {}
+
+    def _write_resolution_cache(self, cache):
+        # write to a temp file and rename it, so that concurrently running opp_env processes never see a partial file
+        import tempfile
+        cache_file = os.path.join(self.get_workspace_admin_directory(), self.RESOLUTION_CACHE_FILE)
+        try:
+            fd, temp_file = tempfile.mkstemp(dir=self.get_workspace_admin_directory(), prefix="." + self.RESOLUTION_CACHE_FILE + ".")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(cache, f)
+                os.replace(temp_file, cache_file)
+            except BaseException:
+                os.remove(temp_file)
+                raise
+        except Exception as e:
+            _logger.debug(f"Could not save the resolution cache of the workspace: {e}")
+
     def get_project_root_directory(self, project_description):
         return os.path.join(self.root_directory, project_description.get_full_folder_name())
 
@@ -1198,11 +2394,19 @@ class Workspace:
         return os.path.join(self.get_project_admin_directory(project_description, create=create_dir), filename)
 
     def is_project_modified(self, project_description):
-        postdownload_shasums = self.read_project_shasums(project_description, "postdownload")
-        last_shasums = self.read_project_shasums(project_description, "last")
-        new_files, disappeared_files, changed_files = self.compare_shasums(postdownload_shasums, last_shasums)
-        self.print_shasums_comparison_result(new_files, disappeared_files, changed_files, label=f"File changes in {project_description} since download", root_dir=self.get_project_root_directory(project_description))
-        return disappeared_files or changed_files # new files do not count  (TODO or: should count, except for build outputs?)
+        admin_dir = self.get_project_admin_directory(project_description)
+        # filter both, as the postdownload snapshot may have been recorded under a different change tracking policy
+        file_filter = ChangeTrackingFilter.for_project(project_description)
+        snapshots = {}
+        for snapshot_name in ["postdownload", "last"]:
+            snapshots[snapshot_name] = self._read_snapshot(admin_dir, snapshot_name)
+            if snapshots[snapshot_name] is None:
+                raise Exception(f"Cannot check whether {project_description.get_full_name()} has been modified: its {snapshot_name} snapshot is missing from {admin_dir}")
+        _, postdownload_entries = snapshots["postdownload"]
+        _, last_entries = snapshots["last"]
+        postdownload_entries, last_entries = file_filter.filter_entries(postdownload_entries), file_filter.filter_entries(last_entries)
+        counts = self.print_snapshot_comparison_result(compare_snapshots(postdownload_entries, last_entries), label=f"File changes in {project_description} since download")
+        return counts["disappeared"] or counts["changed"] # new files do not count  (TODO or: should count, except for build outputs?)
 
     def read_project_state_file(self, project_description):
         state_file_name = self.get_project_admin_file(project_description, "state")
@@ -1225,8 +2429,10 @@ class Workspace:
 
     def update_project_state(self, project_description, **kwargs):
         data = self.read_project_state_file(project_description)
-        data.update(kwargs)
-        self.write_project_state_file(project_description, data)
+        if any(data.get(key) != value for key, value in kwargs.items()) or not data:
+            # only write if changed, as the state file's modification time is part of get_installed_projects_fingerprint()
+            data.update(kwargs)
+            self.write_project_state_file(project_description, data)
 
     def download_project(self, project_description, effective_project_descriptions, patch=True, cleanup=True, local=False, git_branch=None, vars_to_keep=None):
         def get_env(varname, what):
@@ -1236,6 +2442,7 @@ class Workspace:
                 raise Exception(f"Environment variable {varname} not set, it should point to {what}")
             return value
 
+        import shutil
         _logger.info(f"Downloading project {cyan(project_description.get_full_name())} in workspace {cyan(self.root_directory)}")
         project_dir = self.get_project_root_directory(project_description)
         if os.path.exists(project_dir):
@@ -1303,54 +2510,482 @@ class Workspace:
                     shutil.rmtree(project_dir)
             raise e
 
-    def record_project_shasums(self, project_description, snapshot_name):
-        # exclude the Simulation IDE's directory from the shasum, because ./configure and eclipse itself modifies stuff in it
+    # files modified this recently (in nanoseconds) before a snapshot was taken are rehashed next time, even if their
+    # stat data is unchanged, because a modification within the timestamp granularity of the file system (which
+    # can be as coarse as 1-2 seconds) would not show up in their mtime
+    STAT_CACHE_RACY_WINDOW_NS = 2_000_000_000
+
+    # snapshots whose stat data is used to avoid rehashing unchanged files; "extracted" is written during tarball extraction
+    STAT_CACHE_SNAPSHOTS = ["extracted", "prepatch", "postdownload", "last"]
+
+    def record_project_shasums(self, project_description, snapshot_name, use_change_journal=True):
+        # Records the SHA-1 digests and stat data (size, mtime_ns, inode) of the project's files into <snapshot_name>.snap.
+        # Only the files selected by the project's change tracking policy are recorded (by default, build outputs are
+        # skipped). Files whose stat data is unchanged since an earlier snapshot are not read again, which makes
+        # re-recording a large (e.g. built) project tree mostly a stat walk. If 'opp_env watch' is running, even the walk
+        # is avoided: only the files in its change journal are looked at. The postdownload snapshot is also exported as text
+        # into postdownload.sha, in the format of the 'shasum' tool.
+        import time
         project_root = self.get_project_root_directory(project_description)
-        shasum_file = self.get_project_admin_file(project_description, snapshot_name+".sha", create_dir=True)
-        # note: we chdir into project_root so that the shasum file will contain project-relative paths not absolute ones
-        self.run_command(f"cd {project_root} && find . \\( -path ./{self.PROJECT_ADMIN_DIR} -o -path ./ide \\) -prune -o -type f -print0 | xargs -0 shasum > {shasum_file}")
+        admin_dir = self.get_project_admin_directory(project_description, create=True)
+        file_filter = ChangeTrackingFilter.for_project(project_description)
+        recording_time_ns = time.time_ns()
+        result = self._update_snapshot_from_change_journal(project_root, admin_dir, file_filter) if use_change_journal else None
+        if result is not None:
+            entries, num_hashed = result
+            source = "the change journal"
+        else:
+            entries, num_hashed = self._compute_snapshot_entries(project_root, admin_dir, self._walk_project_files(project_root, file_filter))
+            source = "a walk of the project tree"
+        write_snapshot_file(os.path.join(admin_dir, snapshot_name + ".snap"), recording_time_ns, entries)
+        if snapshot_name == "postdownload":
+            with open(os.path.join(admin_dir, snapshot_name + ".sha"), "w") as f:
+                export_snapshot_as_text(entries, f)
+        _logger.debug(f"Recorded {snapshot_name} snapshot of {cyan(project_description.get_full_name())} from {source}: {len(entries)} files, {num_hashed} of them hashed")
+
+    @staticmethod
+    def _compute_snapshot_entries(project_root, admin_dir, files):
+        # files: path-sorted (path, stat result) pairs; returns the snapshot entries and the number of files that had to be hashed
+        stat_cache = Workspace._open_stat_cache(admin_dir)
+        digests = [stat_cache.lookup(filepath, st) for filepath, st in files]
+        to_hash = [i for i, digest in enumerate(digests) if digest is None]
+        for i, digest in zip(to_hash, compute_file_digests(os.path.join(project_root, files[i][0]) for i in to_hash)):
+            digests[i] = digest
+        entries = [(filepath, digest, st.st_size, st.st_mtime_ns, st.st_ino) for (filepath, st), digest in zip(files, digests)]
+        return entries, len(to_hash)
+
+    @staticmethod
+    def _walk_project_files(project_root, file_filter=None):
+        # returns (project-relative path in './dir/file' form, stat result) for all regular files of the project
+        # accepted by file_filter (a ChangeTrackingFilter), excluding the project admin directory and the Simulation
+        # IDE's directory (./configure and the IDE itself modify stuff in it); the result is sorted by path
+        excluded_paths = {f"./{Workspace.PROJECT_ADMIN_DIR}", "./ide"}
+        todo = ["."]
+        result = []
+        while todo:
+            dir = todo.pop()
+            with os.scandir(os.path.join(project_root, dir)) as it:
+                for entry in it:
+                    filepath = dir + "/" + entry.name
+                    if filepath in excluded_paths:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if not file_filter or not file_filter.is_pruned(filepath):
+                            todo.append(filepath)
+                    elif entry.is_file(follow_symlinks=False):
+                        if not file_filter or file_filter.is_tracked(filepath):
+                            result.append((filepath, entry.stat(follow_symlinks=False)))
+        result.sort(key=lambda item: item[0])
+        return result
+
+    @staticmethod
+    def _read_snapshot(admin_dir, snapshot_name):
+        # returns (recording_time_ns, iterator over the entries) of the snapshot, or None if it does not exist;
+        # falls back to the text (.sha) files of workspaces created by earlier opp_env versions, which have no stat data
+        snapshot_file = os.path.join(admin_dir, snapshot_name + ".snap")
+        if os.path.isfile(snapshot_file):
+            return read_snapshot_file(snapshot_file)
+        shasum_file = os.path.join(admin_dir, snapshot_name + ".sha")
+        if os.path.isfile(shasum_file):
+            with open(shasum_file) as f:
+                entries = []
+                for line in f:
+                    if line.strip():
+                        shasum, filepath = line.rstrip("\n").split("  ", 1)
+                        entries.append((filepath, bytes.fromhex(shasum), -1, -1, -1))
+            entries.sort(key=lambda entry: entry[0])
+            return 0, iter(entries)
+        return None
+
+    class _StatCache:
+        # Looks up the digests of files by their stat data in the earlier snapshots of a project. The lookups must come
+        # in path order: the snapshots are traversed in parallel with them (merge-join), so they are never fully loaded.
+        def __init__(self, snapshots):
+            self.cursors = []  # [trusted_before_ns, iterator, current entry]
+            for recording_time_ns, entries in snapshots:
+                self.cursors.append([recording_time_ns - Workspace.STAT_CACHE_RACY_WINDOW_NS, entries, next(entries, None)])
+
+        def lookup(self, filepath, st):
+            result = None
+            for cursor in self.cursors:
+                trusted_before_ns, entries, entry = cursor
+                while entry is not None and entry[0] < filepath:
+                    entry = next(entries, None)
+                cursor[2] = entry
+                if result is None and entry is not None and entry[0] == filepath and entry[2:] == (st.st_size, st.st_mtime_ns, st.st_ino) and entry[3] < trusted_before_ns:
+                    result = entry[1]
+            return result
+
+    @staticmethod
+    def _open_stat_cache(admin_dir):
+        snapshots = []
+        for snapshot_name in Workspace.STAT_CACHE_SNAPSHOTS:
+            try:
+                snapshot = Workspace._read_snapshot(admin_dir, snapshot_name)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+            except Exception as e:
+                _logger.debug(f"Ignoring unreadable {snapshot_name} snapshot in {admin_dir}: {e}")
+        return Workspace._StatCache(snapshots)
+
+    @staticmethod
+    def check_project_files(project_root, snapshot_name="postdownload", file_filter=None):
+        # Verifies the files listed in the given snapshot of the project, like 'shasum --check' would, but using
+        # the stat cache and parallel hashing. Returns the list of (path, "MODIFIED" or "MISSING") pairs. If file_filter
+        # (the project's ChangeTrackingFilter) is given, only the files it selects are checked, and the change journal
+        # of 'opp_env watch' may be used instead of looking at all of them; without it, the journal cannot be used,
+        # as the snapshots it is applied to only cover the tracked files.
+        admin_dir = os.path.join(project_root, Workspace.PROJECT_ADMIN_DIR)
+        snapshot = Workspace._read_snapshot(admin_dir, snapshot_name)
+        if snapshot is None:
+            raise Exception(f"No {snapshot_name} snapshot in {admin_dir}")
+        recorded_entries = file_filter.filter_entries(snapshot[1]) if file_filter else snapshot[1]
+        result = Workspace._update_snapshot_from_change_journal(project_root, admin_dir, file_filter) if file_filter else None
+        if result is not None:
+            current_entries, _ = result
+            return [(filepath, "MISSING" if kind == "disappeared" else "MODIFIED") for kind, filepath in compare_snapshots(recorded_entries, current_entries) if kind != "new"]
+        stat_cache = Workspace._open_stat_cache(admin_dir)
+        result = []
+        to_hash = []
+        for filepath, digest, *_ in recorded_entries:
+            try:
+                st = os.stat(os.path.join(project_root, filepath), follow_symlinks=False)
+            except FileNotFoundError:
+                result.append((filepath, "MISSING"))
+                continue
+            cached_digest = stat_cache.lookup(filepath, st)
+            if cached_digest is None:
+                to_hash.append((filepath, digest))
+            elif cached_digest != digest:
+                result.append((filepath, "MODIFIED"))
+        current_digests = compute_file_digests(os.path.join(project_root, filepath) for filepath, _ in to_hash)
+        result += [(filepath, "MODIFIED") for (filepath, digest), current_digest in zip(to_hash, current_digests) if current_digest != digest]
+        return result
+
+    # The change journal is written by 'opp_env watch' into the project admin directory. Its first line is a header with
+    # the time the journal was started and the PID of the watcher process; then each line is "<time_ns> <path>" for a
+    # changed file, or "<time_ns> <dirpath>/" for a directory whose contents may have all changed (e.g. it was moved away).
+    # Lines starting with "!" mean that changes may have been lost (event queue overflow) or are no longer recorded
+    # (watcher stopped), and make the journal unusable. "#sync <token>" lines answer the requests made by creating a
+    # "changes.sync.<token>" file. Whenever a snapshot is recorded, the watcher restarts the journal from the time of the
+    # snapshot, keeping only the later lines (and the answers to pending requests), so the journal does not keep growing.
+    CHANGE_JOURNAL_FILE = "changes.journal"
+    CHANGE_JOURNAL_SYNC_FILE_PREFIX = "changes.sync."
+    CHANGE_JOURNAL_SYNC_TIMEOUT = 2.0
+
+    @staticmethod
+    def _read_change_journal_header(journal_file):
+        # returns (start_time_ns, pid), or None if there is no journal
+        try:
+            with open(journal_file) as f:
+                header = f.readline().split()
+            return int(header[-3]), int(header[-1])  # "# opp_env change journal, started <time_ns> pid <pid>"
+        except (FileNotFoundError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_process_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @staticmethod
+    def _sync_change_journal(admin_dir):
+        # Makes sure the watcher has journaled all changes made until now (it may be lagging behind the events), by
+        # asking it to put a marker into the journal. Returns the content of the journal, or None on timeout.
+        # Each request has its own sync file, so that concurrent requests do not overwrite each other.
+        import time
+        journal_file = os.path.join(admin_dir, Workspace.CHANGE_JOURNAL_FILE)
+        token = f"{os.getpid()}-{time.time_ns()}"
+        sync_file = os.path.join(admin_dir, Workspace.CHANGE_JOURNAL_SYNC_FILE_PREFIX + token)
+        open(sync_file, "w").close()
+        try:
+            deadline = time.monotonic() + Workspace.CHANGE_JOURNAL_SYNC_TIMEOUT
+            while True:
+                try:
+                    with open(journal_file) as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    return None  # the watcher is restarting the journal
+                if f"#sync {token}\n" in content:
+                    return content
+                if time.monotonic() > deadline:
+                    return None
+                time.sleep(0.01)
+        finally:
+            os.remove(sync_file)
 
-    def read_project_shasums(self, project_description, snapshot_name, allow_missing=False):
-        shasum_file = self.get_project_admin_file(project_description, snapshot_name+".sha")
-        if allow_missing and not os.path.isfile(shasum_file):
+    @staticmethod
+    def _update_snapshot_from_change_journal(project_root, admin_dir, file_filter=None):
+        # Computes the current snapshot entries of the project from its most recent snapshot and the paths that 'opp_env watch'
+        # journaled as changed since that snapshot was recorded, without walking the project tree. Returns (entries, number
+        # of files hashed), or None if the journal cannot be used, e.g. because the watcher is not running; callers then
+        # fall back to walking the tree.
+        journal_file = os.path.join(admin_dir, Workspace.CHANGE_JOURNAL_FILE)
+        header = Workspace._read_change_journal_header(journal_file)
+        if header is None:
             return None
-        with open(shasum_file, 'r') as f:
-            output = f.read()
-        results = {}
-        lines = output.strip().split('\n')
-        for line in lines:
-            shasum, filepath = line.strip().split(maxsplit=1)
-            results[filepath] = shasum
-        return results
-
-    def compare_shasums(self, shasums1, shasums2, label=None, root_dir=None):
-        new_files = []
-        disappeared_files = []
-        changed_files = []
-        for filepath, shasum in shasums1.items():
-            if filepath in shasums2:
-                if shasums2[filepath] != shasum:
-                    changed_files.append(filepath)
+        start_time_ns, pid = header
+        if not Workspace._is_process_alive(pid):
+            _logger.debug(f"Not using the change journal in {admin_dir}: the watcher process (pid {pid}) is no longer running")
+            return None
+
+        # base: the most recent snapshot taken since the journal was started
+        base = None
+        for snapshot_name in ["last", "postdownload"]:
+            snapshot = Workspace._read_snapshot(admin_dir, snapshot_name)
+            if snapshot is not None and snapshot[0] >= start_time_ns and (base is None or snapshot[0] > base[0]):
+                base = snapshot
+        if base is None:
+            return None
+        base_time_ns, base_entries = base
+
+        try:
+            content = Workspace._sync_change_journal(admin_dir)
+        except OSError as e:
+            _logger.debug(f"Not using the change journal in {admin_dir}: {e}")
+            return None
+        if content is None:
+            _logger.debug(f"Not using the change journal in {admin_dir}: the watcher process (pid {pid}) did not respond")
+            return None
+        lines = content.splitlines()
+        header = lines[0].split()
+        if header[-2:] != ["pid", str(pid)] or int(header[-3]) > base_time_ns:
+            return None  # the journal was restarted in the meantime, and no longer covers all changes since the base snapshot
+        changed_paths = set()
+        changed_dirs = []
+        for line in lines[1:]:
+            if line.startswith("!"):
+                _logger.debug(f"Not using the change journal in {admin_dir}: {line[1:]}")
+                return None
+            if line.startswith("#"):
+                continue
+            time_ns, filepath = line.split(" ", 1)
+            if int(time_ns) >= base_time_ns:
+                if filepath.endswith("/"):
+                    changed_dirs.append(filepath)
+                else:
+                    changed_paths.add(filepath)
+
+        # keep the unaffected entries of the base snapshot, and look at the rest (and the new files) again
+        changed_dirs = tuple(changed_dirs)
+        entries = []
+        for entry in base_entries:
+            if entry[0] in changed_paths or entry[0].startswith(changed_dirs):
+                changed_paths.add(entry[0])
+            elif not file_filter or file_filter.is_tracked(entry[0]):  # the base may have been recorded under a different policy
+                entries.append(entry)
+        import stat
+        files = []
+        for filepath in sorted(changed_paths):
+            if file_filter and not file_filter.is_tracked(filepath):
+                continue
+            try:
+                st = os.stat(os.path.join(project_root, filepath), follow_symlinks=False)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            if stat.S_ISREG(st.st_mode):
+                files.append((filepath, st))
+        new_entries, num_hashed = Workspace._compute_snapshot_entries(project_root, admin_dir, files)
+        entries += new_entries
+        entries.sort(key=lambda entry: entry[0])
+        return entries, num_hashed
+
+    def watch_projects(self, project_descriptions):
+        # Runs until interrupted: watches the trees of the given projects with inotify, and appends the paths of changed
+        # files to their change journals (see CHANGE_JOURNAL_FILE). Only changes made on this host are seen, so
+        # the journal is not a replacement for tree walks if the workspace is modified over the network.
+        import signal
+        import time
+        def terminate(signum, frame):
+            raise KeyboardInterrupt()
+        signal.signal(signal.SIGTERM, terminate)
+
+        from concurrent.futures import ThreadPoolExecutor
+        inotify = Inotify()
+        rescan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescan")
+        file_mask = Inotify.IN_MODIFY | Inotify.IN_ATTRIB | Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO | Inotify.IN_CREATE | Inotify.IN_DELETE
+        dir_mask = file_mask | Inotify.IN_ONLYDIR | Inotify.IN_DONT_FOLLOW | Inotify.IN_EXCL_UNLINK
+        watches = {}  # wd -> (project, project-relative directory path), or (project, None) for the admin directory
+        projects = []
+
+        class Project:
+            pass
+
+        def journal(project, filepath):
+            # a file is only journaled once per batch of events (e.g. a file being written produces a series of events)
+            if filepath in project.journaled_paths:
+                return
+            project.journaled_paths.add(filepath)
+            if "\n" in filepath:
+                project.journal.write(f"!unsupported file name: {filepath!r}\n")
+            else:
+                project.journal.write(f"{time.time_ns()} {filepath}\n")
+
+        def add_watches(project, dirpath, journal_files):
+            # watches the directory tree, optionally journaling the files found in it (for directories that appeared)
+            excluded_paths = {f"./{Workspace.PROJECT_ADMIN_DIR}", "./ide"}
+            todo = [dirpath]
+            while todo:
+                dirpath = todo.pop()
+                try:
+                    watches[inotify.add_watch(os.path.join(project.root, dirpath), dir_mask)] = (project, dirpath)
+                    with os.scandir(os.path.join(project.root, dirpath)) as it:
+                        for entry in it:
+                            filepath = dirpath + "/" + entry.name
+                            if entry.is_dir(follow_symlinks=False):
+                                if filepath not in excluded_paths and not project.file_filter.is_pruned(filepath):
+                                    todo.append(filepath)
+                            elif journal_files:
+                                journal(project, filepath)
+                except (FileNotFoundError, NotADirectoryError):
+                    pass  # already gone
+                except OSError as e:
+                    # e.g. the inotify watch limit was reached (see /proc/sys/fs/inotify/max_user_watches)
+                    project.watch_error = f"could not watch {dirpath}: {e.strerror}"
+                    if project.journal:
+                        project.journal.write(f"!{project.watch_error}\n")
+                    _logger.warning(f"Could not watch {cyan(os.path.join(project.root, dirpath))}, change journal of {cyan(project.description.get_full_name())} is disabled: {e}")
+
+        def start_journal(project, background=False):
+            # (re)starts the journal from scratch, and takes a snapshot that later updates can be based on; with background=True,
+            # the snapshot is recorded in another thread, and until it is done, the journal is not used (it has no base)
+            project.journal_start_time_ns = time.time_ns()
+            project.journal = open(project.journal_file, "w")
+            project.journal.write(f"# opp_env change journal, started {project.journal_start_time_ns} pid {os.getpid()}\n")
+            if project.watch_error:
+                project.journal.write(f"!{project.watch_error}\n")
+            project.journal.flush()
+            if background:
+                rescan_executor.submit(record_snapshot, project)
             else:
-                disappeared_files.append(filepath)
-        for filepath in shasums2.keys():
-            if filepath not in shasums1:
-                new_files.append(filepath)
+                record_snapshot(project)
+
+        def record_snapshot(project):
+            try:
+                self.record_project_shasums(project.description, "last", use_change_journal=False)
+            except Exception as e:
+                _logger.warning(f"Could not record a snapshot of {cyan(project.description.get_full_name())}: {e}")
+
+        def compact_journal(project, snapshot_file):
+            # Called when a snapshot has been recorded: the journal is restarted from the time of the snapshot, as the lines
+            # before it are not needed by anyone (the journal is always applied to the most recent snapshot).
+            try:
+                snapshot_time_ns, _ = read_snapshot_file(snapshot_file)
+            except Exception:
+                return
+            if snapshot_time_ns <= project.journal_start_time_ns:
+                return
+            project.journal.close()
+            with open(project.journal_file) as f:
+                lines = f.readlines()[1:]
+            if not any(line.startswith("!") for line in lines):  # otherwise it stays unusable until restarted
+                def is_needed(line):
+                    if line.startswith("#sync "):
+                        return os.path.exists(os.path.join(project.admin_dir, Workspace.CHANGE_JOURNAL_SYNC_FILE_PREFIX + line.split()[1]))
+                    return not line.startswith("#") and int(line.split(" ", 1)[0]) >= snapshot_time_ns
+                temp_file = project.journal_file + ".tmp"
+                with open(temp_file, "w") as f:
+                    f.write(f"# opp_env change journal, started {snapshot_time_ns} pid {os.getpid()}\n")
+                    f.writelines(line for line in lines if is_needed(line))
+                os.replace(temp_file, project.journal_file)
+                project.journal_start_time_ns = snapshot_time_ns
+            project.journal = open(project.journal_file, "a")
+
+        for project_description in project_descriptions:
+            project = Project()
+            project.description = project_description
+            project.root = self.get_project_root_directory(project_description)
+            project.admin_dir = self.get_project_admin_directory(project_description)
+            project.file_filter = ChangeTrackingFilter.for_project(project_description)
+            project.journal_file = os.path.join(project.admin_dir, Workspace.CHANGE_JOURNAL_FILE)
+            header = Workspace._read_change_journal_header(project.journal_file)
+            if header and header[1] != os.getpid() and Workspace._is_process_alive(header[1]):
+                raise Exception(f"Project {project_description.get_full_name()} is already being watched by process {header[1]}")
+            if header:
+                os.remove(project.journal_file)
+            for name in os.listdir(project.admin_dir):
+                if name.startswith(Workspace.CHANGE_JOURNAL_SYNC_FILE_PREFIX):
+                    os.remove(os.path.join(project.admin_dir, name))  # left behind by interrupted requests
+            project.journal = None
+            project.journaled_paths = set()
+            project.watch_error = None
+            watches[inotify.add_watch(project.admin_dir, Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO)] = (project, None)
+            add_watches(project, ".", journal_files=False)
+            projects.append(project)
 
-        return new_files, disappeared_files, changed_files
+        for project in projects:
+            start_journal(project)
+        _logger.info(f"Watching projects {cyan(str(project_descriptions))} for changes, press Ctrl+C to stop")
 
-    def print_shasums_comparison_result(self, new_files, disappeared_files, changed_files, label=None, root_dir=None, max_num=10):
+        try:
+            while True:
+                events = inotify.read_events()
+                for project in projects:
+                    project.journaled_paths.clear()
+                for wd, mask, cookie, name in events:
+                    if mask & Inotify.IN_Q_OVERFLOW:
+                        # the snapshots are recorded in the background, so that events keep being read meanwhile
+                        _logger.warning("Inotify event queue overflow, restarting all change journals")
+                        for project in projects:
+                            project.journal.close()
+                            start_journal(project, background=True)
+                            project.journaled_paths.clear()
+                        continue
+                    if wd not in watches:
+                        continue
+                    project, dirpath = watches[wd]
+                    if mask & Inotify.IN_IGNORED:
+                        del watches[wd]
+                    elif dirpath is None:
+                        if name.startswith(Workspace.CHANGE_JOURNAL_SYNC_FILE_PREFIX) and mask & Inotify.IN_CLOSE_WRITE:
+                            project.journal.write(f"#sync {name.removeprefix(Workspace.CHANGE_JOURNAL_SYNC_FILE_PREFIX)}\n")
+                        elif name in ("last.snap", "postdownload.snap"):
+                            compact_journal(project, os.path.join(project.admin_dir, name))
+                    elif mask & Inotify.IN_ISDIR:
+                        filepath = dirpath + "/" + name
+                        if mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM | Inotify.IN_MOVED_TO):
+                            journal(project, filepath + "/")
+                        if mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO) and filepath not in (f"./{Workspace.PROJECT_ADMIN_DIR}", "./ide") and not project.file_filter.is_pruned(filepath):
+                            add_watches(project, filepath, journal_files=True)
+                    else:
+                        journal(project, dirpath + "/" + name)
+                for project in projects:
+                    project.journal.flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            rescan_executor.shutdown(wait=False, cancel_futures=True)
+            for project in projects:
+                if project.journal:
+                    project.journal.write("!watcher stopped\n")
+                    project.journal.close()
+            inotify.close()
+        _logger.info("Stopped watching")
+
+    def print_snapshot_comparison_result(self, differences, label=None, max_num=10):
+        # consumes the output of compare_snapshots(), and returns the number of files per kind of difference;
+        # only the first max_num file names of each kind are kept for printing
+        counts = {"new": 0, "disappeared": 0, "changed": 0}
+        samples = {"new": [], "disappeared": [], "changed": []}
+        for kind, filepath in differences:
+            counts[kind] += 1
+            if len(samples[kind]) < max_num:
+                samples[kind].append(filepath)
         if _logger.isEnabledFor(logging.DEBUG):
-            if root_dir and root_dir[-1] != "/":
-                root_dir += "/"
-            def log_list(label, list):
-                if list:
-                    note = f" ... and {len(list)-max_num} more" if len(list) > max_num else ""
-                    _logger.debug(label + ": " + ' '.join([(f.removeprefix(root_dir or "")) for f in list[:max_num]]) + note)
-            _logger.debug(f"{label or 'Files'}: {len(new_files)} new, {len(disappeared_files)} disappeared, {len(changed_files)} changed")
-            log_list('New files', new_files)
-            log_list('Disappeared files', disappeared_files)
-            log_list('Changed files', changed_files)
+            def log_list(label, kind):
+                if samples[kind]:
+                    note = f" ... and {counts[kind]-max_num} more" if counts[kind] > max_num else ""
+                    _logger.debug(label + ": " + ' '.join([f.removeprefix("./") for f in samples[kind]]) + note)
+            _logger.debug(f"{label or 'Files'}: {counts['new']} new, {counts['disappeared']} disappeared, {counts['changed']} changed")
+            log_list('New files', "new")
+            log_list('Disappeared files', "disappeared")
+            log_list('Changed files', "changed")
+        return counts
 
     def show_warnings_before_download(self, project_descriptions, pause_after_warnings=True):
         # the ones that have warnings and are not yet downloaded
@@ -1373,23 +3008,100 @@ class Workspace:
         else:
             return list(values)[0]
 
-    def download_project_if_needed(self, project_description, effective_project_descriptions, patch=True, cleanup=True, local=False, git_branch=None, vars_to_keep=None):
+    def download_project_if_needed(self, project_description, effective_project_descriptions, patch=True, cleanup=True, local=False, git_branch=None, vars_to_keep=None, background_modification_check=False):
+        # with background_modification_check=True, already downloaded projects are checked for modifications in the
+        # background, and the result is only reported by report_modification_checks() or the shell commands returned
+        # by get_modification_check_report_commands()
         project_state = self.get_project_status(project_description)
         if project_state == Workspace.ABSENT:
             self.download_project(project_description, effective_project_descriptions, patch, cleanup, local=local, git_branch=git_branch, vars_to_keep=vars_to_keep)
         elif project_state == Workspace.INCOMPLETE:
             raise Exception(f"Cannot download '{project_description}': Directory already exists")
         elif project_state == Workspace.DOWNLOADED:
-            self.record_project_shasums(project_description, "last")
-            if self.is_project_modified(project_description):
-                _logger.warning(f"Project {project_description.get_full_name(colored=True)} has been {yellow('MODIFIED')} since download, use the check_{project_description.name} command to see what changed")
-            else:
-                _logger.info(f"Project {project_description.get_full_name(colored=True)} is {green('unmodified')} since download")
+            self.start_modification_check(project_description)
+            if not background_modification_check:
+                self.report_modification_checks()
         else:
             assert False, f"Unknown project state '{project_state}'"
 
         assert self.get_project_status(project_description) == Workspace.DOWNLOADED, f"Wrong project status {self.get_project_status(project_description)} after download"
 
+    def start_modification_check(self, project_description):
+        # Records the "last" snapshot of the project and compares it with the postdownload one in a background thread,
+        # so that hashing a large project tree can overlap with setting up the environment (the hashing itself releases
+        # the GIL). The checks are run one after the other; each one hashes in parallel internally.
+        if self.modification_check_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self.modification_check_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="modification-check")
+        def check():
+            self.record_project_shasums(project_description, "last")
+            return self.is_project_modified(project_description)
+        self.modification_checks.append((project_description, self.modification_check_executor.submit(check)))
+
+    def report_modification_checks(self, file=None):
+        # waits for the pending modification checks to finish, and logs their results (or writes them into the given file,
+        # formatted like the log)
+        def log(level, message):
+            if file is None:
+                _logger.log(level, message)
+            elif _logger.isEnabledFor(level):
+                file.write(ColoredLoggingFormatter().format(logging.makeLogRecord({"levelno": level, "levelname": logging.getLevelName(level), "msg": message})) + "\n")
+        for project_description, future in self.modification_checks:
+            try:
+                modified = future.result()
+            except Exception as e:
+                log(logging.WARNING, f"Could not check whether project {project_description.get_full_name(colored=True)} has been modified since download: {e}")
+                continue
+            if modified:
+                log(logging.WARNING, f"Project {project_description.get_full_name(colored=True)} has been {yellow('MODIFIED')} since download, use the check_{project_description.name} command to see what changed")
+            else:
+                log(logging.INFO, f"Project {project_description.get_full_name(colored=True)} is {green('unmodified')} since download")
+        self.modification_checks = []
+
+    def get_modification_check_report_commands(self, interactive):
+        # Returns shell commands that print the results of the pending modification checks once they are available:
+        # in an interactive session, in the background, so the prompt is not held up by the checks; otherwise, before the
+        # session's commands. Either way, the shell functions that modify the project trees (build_*, clean_*, etc.)
+        # wait for the checks to finish (see get_modification_check_wait_command()). Returns [] if there are no pending checks.
+        if not self.modification_checks:
+            return []
+        import threading
+        report_file = os.path.join(self.get_workspace_admin_directory(), f"modification_check_{os.getpid()}.txt")
+        self.modification_check_report_file = report_file
+        def write_report():
+            # the appearance of the report file signals that the checks are done, so it must be created even on errors
+            temp_file = report_file + ".tmp"
+            try:
+                with open(temp_file, "w") as f:
+                    self.report_modification_checks(file=f)
+                os.replace(temp_file, report_file)
+            except Exception as e:
+                try:
+                    with open(report_file, "w") as f:
+                        f.write(f"Could not check the projects for modifications since download: {e}\n")
+                except Exception as e:
+                    _logger.warning(f"Could not write the modification check report {cyan(report_file)}: {e}")
+        threading.Thread(target=write_report, name="modification-check-report", daemon=True).start()
+        wait_command = self.get_modification_check_wait_command()
+        print_command = f"cat '{report_file}' 1>&2 2>/dev/null || true"
+        return [f"{{ {wait_command}; {print_command}; }} &"] if interactive else [wait_command, print_command]
+
+    def get_modification_check_wait_command(self):
+        # A shell command that waits until the report of the pending modification checks has been written. It gives up if
+        # the opp_env process is gone (then the report will never appear). The report file is removed by opp_env after the
+        # session (see remove_modification_check_report()), not by the shell, as several shell functions may wait for it.
+        if not self.modification_check_report_file:
+            return "true"
+        return f"while [ ! -e '{self.modification_check_report_file}' ] && kill -0 {os.getpid()} 2>/dev/null; do sleep 0.05; done"
+
+    def remove_modification_check_report(self):
+        # in case the session did not get as far as printing it
+        if self.modification_check_report_file:
+            for filename in [self.modification_check_report_file, self.modification_check_report_file + ".tmp"]:
+                if os.path.exists(filename):
+                    os.remove(filename)
+            self.modification_check_report_file = None
+
     def _read_file_if_exists(self, fname):
         try:
             with open(fname) as f:
@@ -1398,19 +3110,75 @@ class Workspace:
             return ""
 
     def download_and_unpack_tarball(self, download_url, target_folder):
+        # the tarball is downloaded into a temporary file, because it is unpacked by opp_env itself (see unpack_tarball())
+        import tempfile
         os.makedirs(target_folder)
-        tar_log_file = os.path.join(target_folder, "tar.log")
+        fd, tarball_fname = tempfile.mkstemp(dir=self.get_workspace_admin_directory(), prefix="download_", suffix=".tar.gz")
+        os.close(fd)
         try:
             print(f"{download_url}")
-            self.run_command(f"cd {target_folder} && curl -L --fail --progress-bar {download_url} | tar --strip-components=1 -xzf - 2>{tar_log_file}")
-            os.remove(tar_log_file)
-        except Exception as e:
-            print(self._read_file_if_exists(tar_log_file).strip())
-            raise e
+            self.run_command(f"curl -L --fail --progress-bar -o {tarball_fname} {download_url}")
+            self._extract_tarball(tarball_fname, target_folder)
+        finally:
+            os.remove(tarball_fname)
 
     def unpack_tarball(self, tarball_fname, target_folder):
         os.makedirs(target_folder)
-        self.run_command(f"cd {target_folder} && tar --strip-components=1 -xzf {tarball_fname}")
+        self._extract_tarball(tarball_fname, target_folder)
+
+    def _extract_tarball(self, tarball_fname, target_folder):
+        # Extracts a .tar.gz file into target_folder, stripping the top-level directory (like 'tar --strip-components=1'),
+        # and computes the digests of the regular files while they are written. They are saved as the "extracted"
+        # snapshot, so the snapshots taken after download only need to read the files that were modified since
+        # extraction (e.g. by the patch step).
+        import tarfile
+        import hashlib
+        import time
+        extract_kwargs = {"filter": "tar"} if hasattr(tarfile, "tar_filter") else {}
+        def strip(name):
+            parts = name.lstrip("/").split("/", 1)
+            return parts[1] if len(parts) > 1 else ""
+        real_target_folder = os.path.realpath(target_folder)
+        digests = {}  # path -> digest; a later member with the same name overwrites the earlier one
+        with tarfile.open(tarball_fname, "r|gz") as tar:
+            for member in tar:
+                member.name = strip(member.name)
+                if not member.name or ".." in member.name.split("/"):
+                    continue
+                # refuse to write through symlinks extracted earlier (e.g. 'dir -> /elsewhere' followed by 'dir/file'),
+                # like tar does; the member itself may be a symlink, only its parent directory is resolved
+                real_parent_dir = os.path.realpath(os.path.join(target_folder, os.path.dirname(member.name)))
+                if real_parent_dir != real_target_folder and not real_parent_dir.startswith(real_target_folder + os.sep):
+                    raise Exception(f"Cannot extract '{member.name}' from {tarball_fname}: it would be written outside {target_folder}")
+                if member.islnk():
+                    member.linkname = strip(member.linkname)
+                if not member.isreg():
+                    tar.extract(member, target_folder, **extract_kwargs)
+                    continue
+                filename = os.path.join(target_folder, member.name)
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+                if os.path.lexists(filename):
+                    os.remove(filename)
+                h = hashlib.sha1()
+                with tar.extractfile(member) as src, open(filename, "wb") as dst:
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        h.update(chunk)
+                        dst.write(chunk)
+                # like tarfile.tar_filter: no setuid/setgid/sticky bits, and no write permission for group and others
+                os.chmod(filename, member.mode & 0o755)
+                os.utime(filename, (member.mtime, member.mtime))
+                digests["./" + member.name] = h.digest()
+        admin_dir = os.path.join(target_folder, self.PROJECT_ADMIN_DIR)
+        os.makedirs(admin_dir, exist_ok=True)
+        entries = []
+        for filepath in sorted(digests.keys()):
+            st = os.stat(os.path.join(target_folder, filepath), follow_symlinks=False)
+            entries.append((filepath, digests[filepath], st.st_size, st.st_mtime_ns, st.st_ino))
+        write_snapshot_file(os.path.join(admin_dir, "extracted.snap"), time.time_ns(), entries)
+        _logger.debug(f"Extracted {len(entries)} files into {cyan(target_folder)}")
 
     def download_and_apply_patch(self, patch_url, target_folder):
         curl_log_file = os.path.join(target_folder, "curl.log")
@@ -1424,26 +3192,15 @@ class Workspace:
             print(self._read_file_if_exists(patching_log_file).strip())
             raise e
 
-    @staticmethod
-    def _get_dependencies(project_description, effective_project_descriptions):
-        # find dependencies of the project among effective_projects
-        todo = [project_description]
-        processed = set()
-        deps = []
-        while todo:
-            project = todo.pop()
-            if project not in processed:
-                new_deps = [p for p in effective_project_descriptions if p.name in project.required_projects and p not in processed]
-                deps += new_deps
-                processed.add(project)
-                todo.extend(new_deps)
-        return deps
-
     def _define_shell_functions(self, effective_project_descriptions):
+        # the functions that may modify the project trees must not run while they are being hashed
+        wait_for_modification_checks = self.get_modification_check_wait_command()
+
         def make_build_function(function_name, directory_var, build_commands):
             return f"""
                 function {function_name} ()
                 {{
+                    {wait_for_modification_checks}
                     modes="$*"
                     modes=''${{modes:-$BUILD_MODES}}
                     modes=''${{modes:-release debug}}
@@ -1469,7 +3226,18 @@ class Workspace:
                 export -f {function_name}
             """
 
-        def make_check_function(function_name, project_name, directory_var):
+        # the check functions use opp_env's own file hasher (see check_project_files_main()), with the Python interpreter
+        # that runs opp_env, so that they do not depend on the tools available in the session
+        opp_env_parent_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        # the project's change tracking settings are passed in as JSON, so that the same files are checked as by opp_env itself
+        import shlex
+        def make_check_files_command(project_description):
+            change_tracking = json.dumps({"policy": project_description.change_tracking, "inputs": project_description.potential_build_inputs, "outputs": project_description.potential_build_outputs})
+            return f"\"{sys.executable}\" -E -s -c 'import sys; sys.path.insert(0, \"{opp_env_parent_dir}\"); from opp_env.opp_env import check_project_files_main; sys.exit(check_project_files_main())' {shlex.quote(change_tracking)}"
+
+        def make_check_function(function_name, project_description, directory_var):
+            project_name = project_description.get_full_name()
+            check_files_command = make_check_files_command(project_description)
             return f"""
                 function {function_name} ()
                 {{
@@ -1478,10 +3246,10 @@ class Workspace:
                     echo 'Checking whether files have changed since download...'
                     cd {directory_var}
                     tmp=.opp_env/postdownload_changes.txt
-                    if shasum --check --quiet .opp_env/postdownload.sha > $tmp 2>/dev/null; then
+                    if {check_files_command} > $tmp 2>/dev/null; then
                         echo OK
                     else
-                        cat $tmp | sed 's/FAILED open or read/MISSING/; s/FAILED$/MODIFIED/'
+                        cat $tmp
                         echo -e "{SHELL_YELLOW}WARNING:{SHELL_NOCOLOR} {project_name}: $(cat $tmp | wc -l) file(s) changed since download"
                     fi
                     rm $tmp
@@ -1517,7 +3285,7 @@ class Workspace:
         ]
 
         project_check_function_commands = [
-            make_check_function("check_" + p.name, p.get_full_name(), f"${p.name.upper()}_ROOT")
+            make_check_function("check_" + p.name, p, f"${p.name.upper()}_ROOT")
             for p in effective_project_descriptions
         ]
 
@@ -1543,7 +3311,7 @@ class Workspace:
         else:
             return self._run_command_nixless(command, suppress_stdout=suppress_stdout, check_exitcode=check_exitcode, tracing=tracing)
 
-    def run_commands_with_projects(self, effective_project_descriptions, working_directory=None, commands=[], extra_nix_packages=None, vars_to_keep=None, run_setenv=True, interactive=False, isolated=True, check_exitcode=True, suppress_stdout=False, build_modes=None, tracing=False):
+    def run_commands_with_projects(self, effective_project_descriptions, working_directory=None, commands=[], startup_commands=[], extra_nix_packages=None, vars_to_keep=None, run_setenv=True, interactive=False, isolated=True, check_exitcode=True, suppress_stdout=False, build_modes=None, tracing=False):
 
         nixful = not self.nixless
 
@@ -1553,15 +3321,16 @@ class Workspace:
 
         session_name = '+'.join([str(d) for d in reversed(effective_project_descriptions)])
         project_names = [p.get_full_name() for p in effective_project_descriptions]
+        dependency_graph = DependencyGraph(effective_project_descriptions)
         project_deps = "; ".join([
-            p.get_full_name() + ": " + " ".join([ dep.get_full_name() for dep in Workspace._get_dependencies(p, effective_project_descriptions) ])
+            p.get_full_name() + ": " + " ".join([ dep.get_full_name() for dep in dependency_graph.get_dependencies(p) ])
             for p in effective_project_descriptions
         ])
-        project_shell_hook_commands = sum([p.shell_hook_commands for p in effective_project_descriptions if p.shell_hook_commands], [])
-        project_nix_packages = sum([p.nix_packages for p in effective_project_descriptions], [])
+        project_shell_hook_commands = [command for p in effective_project_descriptions for command in p.shell_hook_commands]
+        project_nix_packages = [package for p in effective_project_descriptions for package in p.nix_packages]
         combined_packages = project_nix_packages + (extra_nix_packages or [])
         project_nix_packages = list({pkg: None for pkg in combined_packages})  # Use a dict to maintain uniqueness
-        project_vars_to_keep = sum([p.vars_to_keep for p in effective_project_descriptions], [])
+        project_vars_to_keep = [var for p in effective_project_descriptions for var in p.vars_to_keep]
         project_setenv_commands = sum([[f"cd '{self.get_project_root_directory(p)}'", *p.setenv_commands] for p in reversed(effective_project_descriptions)], [])
         project_root_environment_variable_assignments = [f"export {p.name.upper()}_ROOT={self.get_project_root_directory(p)}" for p in effective_project_descriptions]
         project_version_environment_variable_assignments = [f"export {p.name.upper()}_VERSION=\"{p.version}\"" for p in effective_project_descriptions]
@@ -1569,9 +3338,11 @@ class Workspace:
         # a custom prompt spec to help users distinguish an opp_env shell from a normal terminal session
         prompt = f"\\[\\e[01;33m\\]{session_name}\\[\\e[00m\\]:\\[\\e[01;34m\\]\\w\\[\\e[00m\\]\\$ "
 
+        import platform
         is_macos = platform.system().lower() == "darwin"
         nproc_command = "nproc" if not is_macos else "sysctl -n hw.ncpu"
 
+        # startup_commands are run after the environment has been set up, before the commands
         shell_hook_lines = [
             'function error() { echo "$*" 1>&2; return 1; }; export -f error',
             'function ll() { ls -l $*; }; export -f ll',
@@ -1589,6 +3360,7 @@ class Workspace:
             f"cd '{working_directory}'" if working_directory else None,
             *self._define_shell_functions(effective_project_descriptions),
             f"echo '{' '.join(extra_nix_packages)}' > {self.get_workspace_admin_directory()}/extra_nix_packages" if extra_nix_packages else None,
+            *startup_commands,
             *commands
         ]
 
@@ -1609,6 +3381,8 @@ class Workspace:
     def _nix_develop(self, nixos, stdenv, nix_packages=[], session_name="", script="", vars_to_keep=None, interactive=False, isolated=True, check_exitcode=True, suppress_stdout=False, tracing=False):
         if not nixos or not stdenv:
             raise Exception(f"The nixos or stdenv field is not defined in any of the effective projects! {nixos=} {stdenv=}")
+        import shutil
+        import tempfile
 
         nix_develop_flake = """{
         inputs = {
@@ -1697,6 +3471,7 @@ class Workspace:
         return result
 
     def _run_command_nixless(self, command, env=None, suppress_stdout=False, check_exitcode=True, tracing=False):
+        import subprocess
         if "\n" not in command:
             _logger.debug(f"Running command: {command}")
         else:
@@ -1729,7 +3504,7 @@ def chop_branch_names(project_names):
     return stripped_projects, git_branches
 
 def resolve_projects(project_full_names, remove_trailing_slash=True):
-    global project_registry
+    project_registry = get_project_registry()
     project_descriptions = [project_registry.get_project_description(ProjectReference.parse(p.rstrip('/') if remove_trailing_slash else p)) for p in project_full_names]
     return project_descriptions
 
@@ -1763,10 +3538,11 @@ def resolve_workspace(workspace_directory, init, nixless_workspace):
     return workspace
 
 def check_project_dependencies(effective_project_descriptions, workspace, pause_after_warnings=True):
+    dependency_graph = DependencyGraph(effective_project_descriptions)
     for project_description in effective_project_descriptions:
         data = workspace.read_project_state_file(project_description)
         last_started_with = data.get("last_started_with", None)
-        starting_with = [ p.get_full_name() for p in Workspace._get_dependencies(project_description, effective_project_descriptions) ]
+        starting_with = [ p.get_full_name() for p in dependency_graph.get_dependencies(project_description) ]
         if last_started_with is not None and starting_with != last_started_with:
             def q(l): return "[" + ", ".join(l) + "]"
             _logger.warning(f"Project {cyan(project_description)} is now being used with a different set of dependencies "
@@ -1776,16 +3552,31 @@ def check_project_dependencies(effective_project_descriptions, workspace, pause_
                 input("Press Enter to continue, or Ctrl+C to abort ")
 
 def update_saved_project_dependencies(effective_project_descriptions, workspace):
+    dependency_graph = DependencyGraph(effective_project_descriptions)
     for project_description in effective_project_descriptions:
-        starting_with = [ p.get_full_name() for p in Workspace._get_dependencies(project_description, effective_project_descriptions) ]
+        starting_with = [ p.get_full_name() for p in dependency_graph.get_dependencies(project_description) ]
         workspace.update_project_state(project_description, last_started_with=starting_with)
 
 
-def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwargs):
+def check_project_files_main():
+    # entry point of the check_<project> shell functions: checks the project in the current directory; the optional
+    # argument is the project's change tracking settings in JSON (see Workspace._define_shell_functions())
+    file_filter = None
+    if len(sys.argv) > 1:
+        change_tracking = json.loads(sys.argv[1])
+        file_filter = ChangeTrackingFilter(change_tracking["policy"], change_tracking["inputs"], change_tracking["outputs"])
+    changes = Workspace.check_project_files(os.getcwd(), file_filter=file_filter)
+    for filepath, status in changes:
+        print(f"{filepath}: {status}")
+    return 1 if changes else 0
+
+def list_subcommand_main(project_name_patterns=None, list_mode="grouped", explain_resolution=False, **kwargs):
     def expand_pattern(project_name_pattern, projects):
         return [p for p in projects if project_name_pattern == p.name or re.match(project_name_pattern+r'\b', p.get_full_name())] # note: prefix match!
 
-    global project_registry
+    project_registry = get_project_registry()
+    if explain_resolution:
+        project_registry.collect_resolution_stats()
     specified_projects = project_registry.get_all_project_descriptions()
     if project_name_patterns:
         tmp = []
@@ -1796,7 +3587,10 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
             tmp += matching_projects
 
         specified_projects = uniq(tmp) # NOTE: No sorting! Order of project versions is STRICTLY determined by the order they are in ProjectRegistry.
-    names = uniq([p.name for p in specified_projects])
+    specified_projects_by_name = {}
+    for p in specified_projects:
+        specified_projects_by_name.setdefault(p.name, []).append(p)
+    names = list(specified_projects_by_name.keys())
 
     def move_to_front(list, name):
         try:
@@ -1815,7 +3609,7 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
             print(p.get_full_name())
     elif list_mode == "grouped":
         for name in names:
-            versions = [p.version for p in specified_projects if p.name == name]
+            versions = [p.version for p in specified_projects_by_name[name]]
             print(f"{name.ljust(name_width)} {cyan('  '.join(versions))}")
     elif list_mode == "names":
         for name in names:
@@ -1827,7 +3621,7 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
                 print(f"{project.name}-{alias_version} -> {project.get_full_name()}")
     elif list_mode == "descriptions":
         for name in names:
-            descriptions = uniq([p.description for p in specified_projects if p.name == name if p.description])
+            descriptions = uniq([p.description for p in specified_projects_by_name[name] if p.description])
             description = descriptions[0] if descriptions else "(no description)"
             print(f"{name.ljust(name_width)} {cyan(description)}")
     elif list_mode == "matching":
@@ -1835,6 +3629,8 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
             raise Exception("No project name patterns specified")
         combinations_list = [expand_pattern(project_name_pattern, specified_projects) for project_name_pattern in project_name_patterns]
         for combination in itertools.product(*combinations_list):
+            if not project_registry.are_compatible(combination):
+                continue  # no need to try resolving it
             expanded = sort_by_project_dependencies(project_registry.expand_dependencies(combination))
             expanded = [p for p in expanded if p in specified_projects]  # drop the dependencies added by 'expand'
             if expanded:
@@ -1844,6 +3640,8 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
             # consider the projects together, not independently
             combinations_list = [expand_pattern(project_name_pattern, specified_projects) for project_name_pattern in project_name_patterns]
             for combination in itertools.product(*combinations_list):
+                if not project_registry.are_compatible(combination):
+                    continue  # no need to try resolving it
                 expanded = sort_by_project_dependencies(project_registry.expand_dependencies(combination))
                 if expanded:
                     print(' '.join([p.get_full_name() for p in expanded]))
@@ -1856,20 +3654,27 @@ def list_subcommand_main(project_name_patterns=None, list_mode="grouped", **kwar
             # consider the projects together, not independently
             combinations_list = [expand_pattern(project_name_pattern, specified_projects) for project_name_pattern in project_name_patterns]
             for combination in itertools.product(*combinations_list):
-                expanded_combinations = project_registry.expand_dependencies(combination, return_all=True)
-                for expanded_combination in expanded_combinations:
+                if not project_registry.are_compatible(combination):
+                    continue  # no need to try resolving it
+                for expanded_combination in project_registry.iter_dependency_expansions(combination):
                     print(' '.join([p.get_full_name() for p in sort_by_project_dependencies(expanded_combination)]))
         else:
             for project in specified_projects:
-                combinations_list = project_registry.expand_dependencies([project], return_all=True)
-                for combination in combinations_list:
+                for combination in project_registry.iter_dependency_expansions([project]):
                     print(' '.join([p.get_full_name() for p in sort_by_project_dependencies(combination)]))
     else:
         raise Exception(f"invalid list mode '{list_mode}'")
 
+    if explain_resolution:
+        stats_list = project_registry.resolution_stats
+        if not stats_list:
+            _logger.info("No dependency resolution was performed")
+        else:
+            project_registry.log_resolution_stats(ResolutionStats.combine(stats_list), f"Dependency resolution, totals of {len(stats_list)} runs")
+
 def info_subcommand_main(projects, raw=False, requested_options=None, **kwargs):
     # resolve project list
-    global project_registry
+    project_registry = get_project_registry()
     if not projects:
         project_descriptions = project_registry.get_all_project_descriptions()
     else:
@@ -1877,13 +3682,13 @@ def info_subcommand_main(projects, raw=False, requested_options=None, **kwargs):
         for project in projects:
             if '-' in project:
                 project_descriptions += [project_registry.get_project_description(ProjectReference.parse(project))]
-            elif project in project_registry.get_project_names():
+            elif project_registry.has_project(project):
                 project_descriptions += project_registry.get_project_versions(project)
             else:
                 raise Exception(project_registry.get_unknown_project_message(project))
 
     if raw:
-        serializable = [vars(p.activate_project_options(requested_options)) for p in project_descriptions]
+        serializable = [p.activate_project_options(requested_options).to_dict() for p in project_descriptions]
         print(json.dumps(serializable, indent=4))
         return
 
@@ -1936,9 +3741,7 @@ def info_subcommand_main(projects, raw=False, requested_options=None, **kwargs):
 def init_subcommand_main(workspace_directory=None, force=False, nixless_workspace=False, **kwargs):
     create_or_init_workspace(workspace_directory, allow_nonempty=force, nixless=nixless_workspace)
 
-def install_subcommand_main(projects, workspace_directory=None, install_without_build=False, requested_options=None, no_dependency_resolution=False, nixless_workspace=False, extra_nix_packages=None, init=False, pause_after_warnings=True, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, run_test=False, run_smoke_test=False, **kwargs):
-    global project_registry
-
+def install_subcommand_main(projects, workspace_directory=None, install_without_build=False, requested_options=None, no_dependency_resolution=False, explain_resolution=False, prefer_installed=False, nixless_workspace=False, extra_nix_packages=None, init=False, pause_after_warnings=True, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, run_test=False, run_smoke_test=False, **kwargs):
     workspace = resolve_workspace(workspace_directory, init, nixless_workspace)
 
     projects, git_branches = chop_branch_names(projects)
@@ -1949,7 +3752,7 @@ def install_subcommand_main(projects, workspace_directory=None, install_without_
     if no_dependency_resolution:
         effective_project_descriptions = sort_by_project_dependencies(activate_project_options(specified_project_descriptions, requested_options))
     else:
-        effective_project_descriptions = sort_by_project_dependencies(project_registry.compute_effective_project_descriptions(specified_project_descriptions, requested_options))
+        effective_project_descriptions = sort_by_project_dependencies(workspace.compute_effective_project_descriptions(specified_project_descriptions, requested_options, explain=explain_resolution, prefer_installed=prefer_installed))
     _logger.info(f"Using specified projects {cyan(str(specified_project_descriptions))} with effective projects {cyan(str(effective_project_descriptions))} in workspace {cyan(workspace.root_directory)}")
 
     check_project_dependencies(effective_project_descriptions, workspace, pause_after_warnings)
@@ -1988,9 +3791,7 @@ def check_multiple_versions(project_descriptions):
             def q(l): return "[" + ", ".join(l) + "]"
             raise Exception(f"Multiple versions specified for project {cyan(name)}: {cyan(q(versions))} -- only one version of a project may be active at a time")
 
-def shell_subcommand_main(projects, workspace_directory=[], chdir=False, requested_options=None, no_dependency_resolution=False, init=False, extra_nix_packages=None, install=False, install_without_build=False, build=False, nixless_workspace=False, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, pause_after_warnings=True, **kwargs):
-    global project_registry
-
+def shell_subcommand_main(projects, workspace_directory=[], chdir=False, requested_options=None, no_dependency_resolution=False, explain_resolution=False, prefer_installed=False, init=False, extra_nix_packages=None, install=False, install_without_build=False, build=False, nixless_workspace=False, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, pause_after_warnings=True, **kwargs):
     workspace = resolve_workspace(workspace_directory, init, nixless_workspace)
 
     projects, git_branches = chop_branch_names(projects)
@@ -2004,7 +3805,7 @@ def shell_subcommand_main(projects, workspace_directory=[], chdir=False, request
     if no_dependency_resolution:
         effective_project_descriptions = sort_by_project_dependencies(activate_project_options(specified_project_descriptions, requested_options))
     else:
-        effective_project_descriptions = sort_by_project_dependencies(project_registry.compute_effective_project_descriptions(specified_project_descriptions, requested_options))
+        effective_project_descriptions = sort_by_project_dependencies(workspace.compute_effective_project_descriptions(specified_project_descriptions, requested_options, explain=explain_resolution, prefer_installed=prefer_installed))
     _logger.info(f"Using specified projects {cyan(str(specified_project_descriptions))} with effective projects {cyan(str(effective_project_descriptions))} in workspace {cyan(workspace.root_directory)}")
 
     if not install:
@@ -2018,7 +3819,7 @@ def shell_subcommand_main(projects, workspace_directory=[], chdir=False, request
 
     if install:
         for project_description in reversed(effective_project_descriptions):
-            workspace.download_project_if_needed(project_description, effective_project_descriptions, patch=patch, cleanup=cleanup, local=local, git_branch=git_branches.get(project_description.get_full_name()), vars_to_keep=vars_to_keep)
+            workspace.download_project_if_needed(project_description, effective_project_descriptions, patch=patch, cleanup=cleanup, local=local, git_branch=git_branches.get(project_description.get_full_name()), vars_to_keep=vars_to_keep, background_modification_check=True)
 
     update_saved_project_dependencies(effective_project_descriptions, workspace)
 
@@ -2047,11 +3848,14 @@ def shell_subcommand_main(projects, workspace_directory=[], chdir=False, request
         else:
             _logger.debug(f"No need to change directory, wd={cyan(os.getcwd())} is already under the first project's directory {cyan(first_project_dir)}")
 
-    workspace.run_commands_with_projects(effective_project_descriptions, commands=commands, interactive=True, isolated=isolated, extra_nix_packages=extra_nix_packages, check_exitcode=False, vars_to_keep=vars_to_keep, build_modes=build_modes)
-
-def run_subcommand_main(projects, command=None, workspace_directory=None, chdir=False, requested_options=None, no_dependency_resolution=False, init=False, extra_nix_packages=None, install=False, install_without_build=False, build=False, nixless_workspace=False, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, pause_after_warnings=True, run_test=False, run_smoke_test=False, **kwargs):
-    global project_registry
+    # the results of the modification checks started during install are printed when ready; builds wait for them
+    startup_commands = workspace.get_modification_check_report_commands(interactive=True)
+    try:
+        workspace.run_commands_with_projects(effective_project_descriptions, commands=commands, startup_commands=startup_commands, interactive=True, isolated=isolated, extra_nix_packages=extra_nix_packages, check_exitcode=False, vars_to_keep=vars_to_keep, build_modes=build_modes)
+    finally:
+        workspace.remove_modification_check_report()
 
+def run_subcommand_main(projects, command=None, workspace_directory=None, chdir=False, requested_options=None, no_dependency_resolution=False, explain_resolution=False, prefer_installed=False, init=False, extra_nix_packages=None, install=False, install_without_build=False, build=False, nixless_workspace=False, isolated=True, vars_to_keep=None, patch=True, cleanup=True, local=False, build_modes=None, pause_after_warnings=True, run_test=False, run_smoke_test=False, **kwargs):
     workspace = resolve_workspace(workspace_directory, init, nixless_workspace)
 
     projects, git_branches = chop_branch_names(projects)
@@ -2065,7 +3869,7 @@ def run_subcommand_main(projects, command=None, workspace_directory=None, chdir=
     if no_dependency_resolution:
         effective_project_descriptions = sort_by_project_dependencies(activate_project_options(specified_project_descriptions, requested_options))
     else:
-        effective_project_descriptions = sort_by_project_dependencies(project_registry.compute_effective_project_descriptions(specified_project_descriptions, requested_options))
+        effective_project_descriptions = sort_by_project_dependencies(workspace.compute_effective_project_descriptions(specified_project_descriptions, requested_options, explain=explain_resolution, prefer_installed=prefer_installed))
     _logger.info(f"Using specified projects {cyan(str(specified_project_descriptions))} with effective projects {cyan(str(effective_project_descriptions))} in workspace {cyan(workspace.root_directory)}")
 
     if not install:
@@ -2078,7 +3882,7 @@ def run_subcommand_main(projects, command=None, workspace_directory=None, chdir=
     workspace.show_warnings_before_download(effective_project_descriptions, pause_after_warnings)
     if install:
         for project_description in reversed(effective_project_descriptions):
-            workspace.download_project_if_needed(project_description, effective_project_descriptions, patch=patch, cleanup=cleanup, local=local, git_branch=git_branches.get(project_description.get_full_name()), vars_to_keep=vars_to_keep)
+            workspace.download_project_if_needed(project_description, effective_project_descriptions, patch=patch, cleanup=cleanup, local=local, git_branch=git_branches.get(project_description.get_full_name()), vars_to_keep=vars_to_keep, background_modification_check=True)
 
     update_saved_project_dependencies(effective_project_descriptions, workspace)
 
@@ -2093,7 +3897,23 @@ def run_subcommand_main(projects, command=None, workspace_directory=None, chdir=
     extra_nix_packages = uniq(workspace.extra_nix_packages + (extra_nix_packages or []))
     extra_nix_packages_str = f" with extra packages: {cyan(' '.join(extra_nix_packages))}" if extra_nix_packages else ""
     _logger.info(f"Running command for projects {cyan(str(effective_project_descriptions))} in workspace {cyan(workspace.root_directory)} in {cyan(kind)} mode{extra_nix_packages_str}")
-    workspace.run_commands_with_projects(effective_project_descriptions, working_directory=working_directory, commands=commands, isolated=isolated, extra_nix_packages=extra_nix_packages, vars_to_keep=vars_to_keep, build_modes=build_modes)
+    # the commands may modify the projects, so they are only run after the modification checks have been reported
+    startup_commands = workspace.get_modification_check_report_commands(interactive=False)
+    try:
+        workspace.run_commands_with_projects(effective_project_descriptions, working_directory=working_directory, commands=commands, startup_commands=startup_commands, isolated=isolated, extra_nix_packages=extra_nix_packages, vars_to_keep=vars_to_keep, build_modes=build_modes)
+    finally:
+        workspace.remove_modification_check_report()
+
+def watch_subcommand_main(projects, workspace_directory=None, **kwargs):
+    workspace_directory = os.path.abspath(workspace_directory) if workspace_directory else Workspace.find_workspace(os.getcwd())
+    workspace = Workspace(workspace_directory)
+    project_descriptions = resolve_projects(projects) if projects else workspace.get_installed_projects()
+    for project_description in project_descriptions:
+        if workspace.get_project_status(project_description) != Workspace.DOWNLOADED:
+            raise Exception(f"Project {cyan(project_description.get_full_name())} is not downloaded")
+    if not project_descriptions:
+        raise Exception(f"No projects to watch in workspace {cyan(workspace.root_directory)}")
+    workspace.watch_projects(project_descriptions)
 
 def upgrade_subcommand_main(**kwargs):
     import subprocess
@@ -2129,13 +3949,19 @@ def upgrade_subcommand_main(**kwargs):
 
     raise Exception("Could not detect how opp_env is installed. Please upgrade manually.")
 
-def maint_subcommand_main(catalog_dir, **kwargs):
-    update_catalog(catalog_dir)
+def maint_subcommand_main(catalog_dir=None, update_manifest=False, compile_database=False, **kwargs):
+    project_registry = get_project_registry()
+    if update_manifest:
+        project_registry.update_manifest()
+    if compile_database:
+        project_registry.update_compiled_database()
+    if catalog_dir:
+        update_catalog(catalog_dir)
 
 def update_catalog(catalog_dir):
     # collect catalog URLs by project name
     _logger.info(f"Collecting catalog_url entries from projects")
-    global project_registry
+    project_registry = get_project_registry()
     project_catalog_urls = {}
     for project_description in project_registry.get_all_project_descriptions():
         catalog_url = project_description.metadata.get("catalog_url")
@@ -2189,12 +4015,18 @@ def main():
             shell_subcommand_main(**kwargs)
         elif subcommand == "run":
             run_subcommand_main(**kwargs)
+        elif subcommand == "watch":
+            watch_subcommand_main(**kwargs)
         elif subcommand == "maint":
             maint_subcommand_main(**kwargs)
         elif subcommand == "upgrade":
             upgrade_subcommand_main(**kwargs)
         else:
             raise Exception(f"Unknown subcommand '{subcommand}'")
+        if _project_registry is not None:
+            _project_registry.save_compatibility_masks()
+            if _logger.isEnabledFor(logging.DEBUG):
+                _project_registry.log_memory_usage()
         _logger.debug(f"The {cyan(subcommand)} operation completed successfully")
         return 0
     except Exception as e:
@@ -2207,7 +4039,6 @@ def main():
         _logger.error(f"The {cyan(subcommand)} operation was interrupted by the user")
         return 130 # = 128 + SIGINT
 
-project_registry = ProjectRegistry()
 
 
 if __name__ == '__main__':